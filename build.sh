@@ -2,4 +2,6 @@
 set -e
 cd innovationhubnitp
 python manage.py migrate --noinput
-exec gunicorn innovationhubnitp.wsgi:application --bind 0.0.0.0:$PORT
+python manage.py createcachetable
+# ASGI, so chat streams and long polls can be held open (see render.yaml).
+exec gunicorn innovationhubnitp.asgi:application --worker-class uvicorn_worker.UvicornWorker --workers 1 --bind 0.0.0.0:$PORT
@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.timezone import now
-from .models import SiteConfiguration, NavbarLink, BentoCard, GuidanceRoadmap, MentorApplication, Inquiry
+from guidance.matching import matcher
+
+from .models import SiteConfiguration, NavbarLink, BentoCard, GuidanceRoadmap, MentorApplication, Inquiry, Task
 
 
 @admin.register(SiteConfiguration)
@@ -116,14 +119,16 @@ class MentorApplicationAdmin(admin.ModelAdmin):
     approval_status.short_description = 'Status'
     
     def approve_mentors(self, request, queryset):
-        """Bulk approve mentor applications."""
-        updated = queryset.update(is_approved=True, reviewed_at=now())
+        """Bulk approve mentor applications and create or update their mentor profiles."""
+        updated = MentorApplication.approve(queryset)
         self.message_user(request, f'{updated} mentors approved successfully.')
     approve_mentors.short_description = 'Approve selected applications'
     
     def reject_mentors(self, request, queryset):
         """Bulk reject (mark unapproved) mentor applications."""
         updated = queryset.update(is_approved=False, reviewed_at=now())
+        # The update sends no signals; rejected expertise leaves the match index.
+        transaction.on_commit(matcher.invalidate)
         self.message_user(request, f'{updated} mentors rejected/reset.')
     reject_mentors.short_description = 'Reject/Reset selected applications'
 
@@ -176,3 +181,29 @@ class InquiryAdmin(admin.ModelAdmin):
         updated = queryset.update(is_resolved=False)
         self.message_user(request, f'{updated} inquiries marked as unresolved.')
     mark_unresolved.short_description = 'Mark selected as unresolved'
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Admin interface for background tasks."""
+    list_display = ['name', 'status', 'attempts', 'run_at', 'finished_at', 'locked_by']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'name', 'args', 'kwargs', 'status', 'attempts', 'max_attempts', 'run_at',
+        'locked_by', 'locked_at', 'result', 'last_error', 'created_at', 'finished_at',
+    ]
+    actions = ['requeue_tasks']
+
+    def has_add_permission(self, request):
+        """Tasks are queued by code, not created by hand."""
+        return False
+
+    def requeue_tasks(self, request, queryset):
+        """Run failed or finished tasks again with a fresh retry budget."""
+        updated = queryset.exclude(status=Task.STATUS_RUNNING).update(
+            status=Task.STATUS_QUEUED, attempts=0, run_at=now(), locked_by='', finished_at=None,
+        )
+        self.message_user(request, f'{updated} tasks queued again.')
+    requeue_tasks.short_description = 'Queue selected tasks again'
@@ -0,0 +1,46 @@
+"""Authentication backend that signs users in by email address."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+
+def users_with_email(email):
+    """
+    Users whose email matches case-insensitively.
+
+    Filters on ``LOWER(email)`` and repeats the index's ``email <> ''`` condition,
+    so the lookup can use the partial unique index added by
+    ``core.0004_user_email_lower_unique``.
+    """
+    User = get_user_model()
+    return (
+        User._default_manager.alias(email_lower=Lower('email'))
+        .filter(email_lower=(email or '').strip().lower())
+        .exclude(email='')
+    )
+
+
+def users_with_emails(emails):
+    """Users matching any of ``emails`` case-insensitively, through the same index."""
+    User = get_user_model()
+    return (
+        User._default_manager.alias(email_lower=Lower('email'))
+        .filter(email_lower__in={(email or '').strip().lower() for email in emails})
+        .exclude(email='')
+    )
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate ``email`` + ``password`` with a single indexed user lookup."""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = users_with_email(email).first()
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords.
+            get_user_model()().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
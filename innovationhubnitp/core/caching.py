@@ -0,0 +1,281 @@
+"""
+Two-tier caching: an in-process LRU (L1) in front of a Django cache (L2).
+
+Each ``TieredCache`` owns a namespace. Its keys carry the namespace's version
+stamp, so ``bump()`` invalidates every key at once in every process. Other
+processes notice the new version within ``l1_ttl`` seconds, which is also how
+long L1 may serve a value without asking L2.
+
+``get_or_set`` protects expensive computations from stampedes:
+
+* single flight: threads of one process that miss the same key wait for a
+  single computation instead of all running it;
+* probabilistic early expiry: as an entry nears expiry, readers refresh it
+  early with growing probability (weighted by how long it took to compute),
+  so hot keys are recomputed before they expire for everyone at once;
+* stale while recomputing: L2 keeps entries past their expiry for another
+  ``ttl``, so while one process recomputes, the others keep serving the old
+  value instead of piling onto the database.
+
+``ChangeLog`` lets in-process indexes follow each other's edits: every
+change is numbered and kept in the shared cache for a while, so a process
+behind by a few changes replays them instead of rebuilding.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe, size-bounded mapping whose entries expire."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+
+
+class TieredCache:
+    """
+    A cache namespace with an L1 LRU over the ``alias`` Django cache.
+
+    ``ttl`` is how long a computed value is fresh, ``l1_ttl`` how long a
+    process keeps it (and the namespace version) without checking L2, and
+    ``beta`` tunes early expiry (0 disables it, above 1 refreshes earlier).
+    ``version_ttl`` expires the version stamp itself, which bounds staleness
+    where a bump can't reach other processes (a per-process L2).
+    """
+
+    def __init__(self, namespace, ttl=300, l1_ttl=5, l1_size=256, beta=1.0, lock_timeout=10, alias='default',
+                 version_ttl=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.alias = alias
+        self.version_ttl = version_ttl
+        self.l1 = LRUCache(l1_size)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._version = None
+        self._version_checked = 0.0
+        self._version_key = f'tiered:{namespace}:version'
+        _namespaces[namespace] = self
+
+    @property
+    def l2(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def version(self):
+        """The namespace's version stamp, re-read from L2 at most every ``l1_ttl`` seconds."""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= self.l1_ttl:
+            version = self.l2.get(self._version_key)
+            if version is None:
+                self.l2.add(self._version_key, time.time_ns(), self.version_ttl)
+                version = self.l2.get(self._version_key)
+            self._version, self._version_checked = version, now
+        return self._version
+
+    def bump(self):
+        """Invalidate every key in the namespace, here at once and elsewhere within ``l1_ttl``."""
+        version = time.time_ns()
+        self.l2.set(self._version_key, version, self.version_ttl)
+        self._version, self._version_checked = version, time.monotonic()
+        self.l1.clear()
+
+    def make_key(self, key):
+        # Hashed so any string makes a valid memcached key.
+        digest = hashlib.sha1(str(key).encode()).hexdigest()
+        return f'tiered:{self.namespace}:{self.version()}:{digest}'
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Return the cached value for ``key``, calling ``compute()`` to fill it when needed."""
+        ttl = self.ttl if ttl is None else ttl
+        full_key = self.make_key(key)
+        value = self.l1.get(full_key)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+
+        stale = _MISSING
+        entry = self.l2.get(full_key)
+        if entry is not None:
+            value, expires_at, delta = entry
+            now = time.time()
+            # XFetch: refresh early with a probability that grows near expiry.
+            if now - delta * self.beta * math.log(1 - random.random()) < expires_at:
+                self._count('l2_hits')
+                self.l1.set(full_key, value, min(self.l1_ttl, expires_at - now))
+                return value
+            self._count('early_refreshes' if now < expires_at else 'expired')
+            stale = value
+        else:
+            self._count('misses')
+        return self._recompute(full_key, compute, ttl, stale)
+
+    def _recompute(self, full_key, compute, ttl, stale):
+        with self._lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+        if not leader:
+            if stale is not _MISSING:
+                self._count('stale_served')
+                return stale
+            self._count('flight_waits')
+            flight.done.wait(self.lock_timeout)
+            if flight.value is not _MISSING:
+                return flight.value
+            # The leader failed or is too slow; compute without it.
+            return compute()
+
+        lock_key = f'{full_key}:lock'
+        locked = False
+        try:
+            # Across processes, one refreshes a stale entry while the others serve it.
+            if stale is not _MISSING:
+                locked = self.l2.add(lock_key, 1, self.lock_timeout)
+                if not locked:
+                    self._count('stale_served')
+                    flight.value = stale
+                    return stale
+            started = time.monotonic()
+            value = compute()
+            delta = time.monotonic() - started
+            self._count('computes')
+            self.l2.set(full_key, (value, time.time() + ttl, delta), ttl * 2)
+            self.l1.set(full_key, value, min(self.l1_ttl, ttl))
+            flight.value = value
+            return value
+        finally:
+            if locked:
+                self.l2.delete(lock_key)
+            with self._lock:
+                del self._flights[full_key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        hits = counts.get('l1_hits', 0) + counts.get('l2_hits', 0)
+        lookups = hits + counts.get('misses', 0) + counts.get('early_refreshes', 0) + counts.get('expired', 0)
+        counts['hit_ratio'] = round(hits / lookups, 4) if lookups else None
+        counts['l1_size'] = len(self.l1)
+        return counts
+
+
+class ChangeLog:
+    """
+    A numbered log of changes in a Django cache, for catching up incrementally.
+
+    ``record(change)`` appends a picklable change and returns its generation.
+    ``since(generation)`` returns ``(current_generation, changes)`` with every
+    change made after ``generation`` in order, or None when they can't all be
+    replayed (more than ``max_entries``, expired, or the cache was cleared)
+    and the caller must rebuild. Generations start from a clock reading, so a
+    counter restarted after a cache clear never reuses old numbers.
+    """
+
+    def __init__(self, name, max_entries=100, ttl=3600, alias='default'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.alias = alias
+        self._counter_key = f'changelog:{name}'
+
+    @property
+    def l2(self):
+        return caches[self.alias]
+
+    def _entry_key(self, generation):
+        return f'{self._counter_key}:{generation}'
+
+    def current(self):
+        generation = self.l2.get(self._counter_key)
+        if generation is None:
+            self.l2.add(self._counter_key, time.time_ns(), None)
+            generation = self.l2.get(self._counter_key)
+        return generation
+
+    def record(self, change):
+        try:
+            generation = self.l2.incr(self._counter_key)
+        except ValueError:
+            self.current()
+            generation = self.l2.incr(self._counter_key)
+        self.l2.set(self._entry_key(generation), (change,), self.ttl)
+        return generation
+
+    def since(self, generation):
+        current = self.current()
+        if generation == current:
+            return current, []
+        if generation is None or not 0 < current - generation <= self.max_entries:
+            return None
+        keys = [self._entry_key(n) for n in range(generation + 1, current + 1)]
+        # A change is numbered before it is stored, so a gap can also mean
+        # one still being recorded.
+        found = self.l2.get_many(keys)
+        if len(found) != len(keys):
+            return None
+        return current, [found[key][0] for key in keys]
+
+
+_namespaces = {}
+
+
+def reset_local_caches():
+    """Forget every namespace's L1 entries and version stamp in this process, e.g. after clearing L2."""
+    for tiered in _namespaces.values():
+        tiered.l1.clear()
+        tiered._version = None
+
+
+def cache_stats():
+    """Per-namespace hit/miss counters of this process's tiered caches."""
+    return {namespace: tiered.stats() for namespace, tiered in sorted(_namespaces.items())}
@@ -1,5 +1,46 @@
 """Context processors to make site configuration and navbar links available globally."""
+from django.conf import settings
+
+from .caching import TieredCache
 from .models import SiteConfiguration, NavbarLink
+from .timing import timed
+
+# How long each worker trusts its in-process copy (and the version stamp)
+# before re-reading the shared cache, and how long the shared cache keeps the
+# chrome data. Edits bump the version, which reaches other workers within
+# SITE_CONTEXT_LOCAL_TTL. Only raise the shared TTL when CACHES points at a
+# cache every worker shares: with local memory the "shared" copy is per
+# process too, and nothing else tells it about edits.
+SITE_CONTEXT_LOCAL_TTL = getattr(settings, 'SITE_CONTEXT_LOCAL_TTL', 30)
+SITE_CONTEXT_CACHE_TTL = getattr(settings, 'SITE_CONTEXT_CACHE_TTL', SITE_CONTEXT_LOCAL_TTL)
+
+site_cache = TieredCache(
+    'core.site_context', ttl=SITE_CONTEXT_CACHE_TTL, l1_ttl=SITE_CONTEXT_LOCAL_TTL, l1_size=1,
+    version_ttl=SITE_CONTEXT_CACHE_TTL,
+)
+
+
+def _load_site_context():
+    """Query the database for site chrome and materialize it for caching."""
+    return {
+        'site_config': SiteConfiguration.get_solo(),
+        'nav_links': list(NavbarLink.objects.filter(is_active=True)),
+    }
+
+
+def get_site_context():
+    """
+    Return site chrome from the in-process copy, the shared cache or the database.
+
+    Entries are keyed on the version read before loading, so a load that raced
+    an edit can only store its stale result under the old version.
+    """
+    return site_cache.get_or_set('site_context', _load_site_context)
+
+
+def invalidate_site_context():
+    """Move site chrome to a new version, here at once and elsewhere within SITE_CONTEXT_LOCAL_TTL."""
+    site_cache.bump()
 
 
 def site_context(request):
@@ -11,7 +52,5 @@ def site_context(request):
         {{ site_config.vision_statement }}
         {% for link in nav_links %}...{% endfor %}
     """
-    return {
-        'site_config': SiteConfiguration.get_solo(),
-        'nav_links': NavbarLink.objects.filter(is_active=True),
-    }
+    with timed('site_context'):
+        return dict(get_site_context())
@@ -0,0 +1,27 @@
+"""Version stamps for template fragments cached with the ``{% cache %}`` tag."""
+from django.conf import settings
+
+from .caching import TieredCache
+
+# Fragments are keyed on the version, so this only bounds how long orphaned
+# renders of old versions linger in the cache.
+BENTO_FRAGMENT_TTL = getattr(settings, 'BENTO_FRAGMENT_TTL', 60 * 60 * 24)
+
+# A bump only reaches the workers that share the cache holding the version.
+# With local memory each worker has its own, so the version expires and is
+# replaced after this long, bounding how stale other workers' grids can be.
+# Raise it (up to BENTO_FRAGMENT_TTL) once CACHES points at a shared cache.
+BENTO_VERSION_TTL = min(getattr(settings, 'BENTO_VERSION_TTL', 30), BENTO_FRAGMENT_TTL)
+
+# Only the namespace version is used: it is the bento grid's fragment version.
+bento_cache = TieredCache('core.bento', ttl=BENTO_FRAGMENT_TTL, version_ttl=BENTO_VERSION_TTL)
+
+
+def get_bento_version():
+    """Return the current bento grid version."""
+    return bento_cache.version()
+
+
+def bump_bento_version():
+    """Start a new bento grid version so cached fragments are re-rendered."""
+    bento_cache.bump()
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small batches so no long-running delete holds locks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        last_key = ''
+        purged = batches = 0
+        started = time.monotonic()
+        while True:
+            # Walk the primary key instead of using OFFSET, so each batch
+            # starts where the previous one stopped.
+            keys = list(
+                expired.filter(session_key__gt=last_key)
+                .order_by('session_key')
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            # Each delete commits on its own, keeping lock time to one batch.
+            deleted, _ = Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()
+            purged += deleted
+            batches += 1
+            last_key = keys[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Batch {batches}: deleted {deleted} sessions')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged} expired sessions in {batches} batches ({time.monotonic() - started:.1f}s).'
+        ))
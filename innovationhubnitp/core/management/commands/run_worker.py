@@ -0,0 +1,55 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import taskqueue
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (see core.taskqueue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed at once')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due instead of waiting')
+        parser.add_argument('--keep-days', type=float, default=7, help='Delete finished tasks older than this')
+        parser.add_argument('--worker-id', default=taskqueue.default_worker_id())
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        worker_id = options['worker_id']
+        batch_size = max(options['batch_size'], 1)
+        keep = timedelta(days=options['keep_days'])
+        self.stdout.write(f'Worker {worker_id} started')
+        total = 0
+        next_purge = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() >= next_purge:
+                purged = taskqueue.purge(keep)
+                if purged and options['verbosity'] > 1:
+                    self.stdout.write(f'Purged {purged} finished tasks')
+                next_purge = time.monotonic() + PURGE_INTERVAL
+            ran = taskqueue.run_batch(worker_id, batch_size)
+            total += ran
+            if options['verbosity'] > 1 and ran:
+                self.stdout.write(f'Ran {ran} tasks')
+            if ran < batch_size:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} stopped after {total} tasks'))
+
+    def _stop(self, signum, frame):
+        # Finish the current batch, then leave the loop.
+        self.stopping = True
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+CONSTRAINT = models.UniqueConstraint(
+    Lower('email'),
+    condition=~models.Q(email=''),
+    name='core_user_email_lower_uniq',
+)
+
+
+def add_email_index(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    duplicates = list(
+        User.objects.exclude(email='')
+        .values(email_lower=Lower('email'))
+        .annotate(total=models.Count('pk'))
+        .filter(total__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add the case-insensitive unique email index; merge or fix the users '
+            'sharing these emails first: ' + ', '.join(duplicates)
+        )
+    schema_editor.add_constraint(User, CONSTRAINT)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model(settings.AUTH_USER_MODEL), CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_inquiry_student_whatsapp_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
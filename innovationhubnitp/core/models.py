@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+# MentorProfile fields copied from an approved application.
+PROFILE_SYNC_FIELDS = ('branch', 'year', 'bio', 'mentor_whatsapp', 'is_approved')
 
 
 class SiteConfiguration(models.Model):
@@ -148,48 +152,133 @@ class MentorApplication(models.Model):
         return f"{self.full_name} ({self.branch} - {self.year}) - {status}"
 
     def save(self, *args, **kwargs):
-        """Persist application then sync an approved mentor into guidance profiles."""
+        """Persist application then queue syncing an approved mentor into guidance profiles."""
+        from .tasks import sync_mentor_profiles
+
         super().save(*args, **kwargs)
         if self.is_approved:
-            self._ensure_mentor_profile()
+            sync_mentor_profiles.delay([self.pk])
+
+    @classmethod
+    def approve(cls, queryset):
+        """
+        Approve ``queryset`` and sync every applicant's mentor account in bulk.
+
+        Does inline for the whole selection what ``save()`` queues per row: users are
+        resolved by email in one query, missing users and profiles are
+        bulk-created and existing profiles bulk-updated, all in one transaction.
+        When an email has several applications the latest one wins. Returns the
+        number of applications approved.
+        """
+        with transaction.atomic():
+            applications = list(queryset)
+            cls.objects.filter(pk__in=[application.pk for application in applications]).update(
+                is_approved=True, reviewed_at=timezone.now(),
+            )
+            cls.sync_profiles(applications)
+        return len(applications)
+
+    @classmethod
+    def sync_profiles(cls, applications):
+        """Create or update the mentor accounts of approved ``applications`` in one transaction."""
+        latest = {}
+        for application in sorted(applications, key=lambda application: (application.applied_at, application.pk)):
+            if application.email:
+                latest[application.email.strip().lower()] = application
+        if not latest:
+            return
+        with transaction.atomic():
+            user_ids = cls._sync_mentor_profiles(latest)
+            # Bulk writes send no signals, so clear what the guidance receivers would.
+            transaction.on_commit(lambda: cls._refresh_guidance(user_ids))
+
+    @classmethod
+    def _sync_mentor_profiles(cls, latest):
+        """Create or update accounts for ``{email: application}``; return their user ids."""
+        from django.contrib.auth import get_user_model
+        from guidance.models import MentorProfile
+        from .backends import users_with_emails
+
+        User = get_user_model()
+        users = {user.email.strip().lower(): user for user in users_with_emails(latest)}
+        missing = [application for email, application in latest.items() if email not in users]
+        if missing:
+            usernames = cls._available_usernames(missing)
+            new_users = []
+            for application in missing:
+                user = User(**application._user_defaults(usernames[application.pk]))
+                user.set_unusable_password()
+                new_users.append(user)
+            User._default_manager.bulk_create(new_users)
+            if any(user.pk is None for user in new_users):
+                # The backend can't return ids from a bulk insert; read them back.
+                users = {user.email.strip().lower(): user for user in users_with_emails(latest)}
+            else:
+                users.update((user.email.strip().lower(), user) for user in new_users)
+
+        user_ids = [users[email].pk for email in latest]
+        profiles = {profile.user_id: profile for profile in MentorProfile.objects.filter(user_id__in=user_ids)}
+        to_create, to_update = [], []
+        for email, application in latest.items():
+            defaults = application._profile_defaults()
+            profile = profiles.get(users[email].pk)
+            if profile is None:
+                to_create.append(MentorProfile(user=users[email], **defaults))
+            else:
+                for field, value in defaults.items():
+                    setattr(profile, field, value)
+                to_update.append(profile)
+        MentorProfile.objects.bulk_create(to_create)
+        MentorProfile.objects.bulk_update(to_update, list(PROFILE_SYNC_FIELDS))
+        return user_ids
 
-    def _ensure_mentor_profile(self):
-        """Create or update a guidance MentorProfile when approved."""
-        try:
-            from django.contrib.auth import get_user_model
-            from guidance.models import MentorProfile
-        except Exception:
-            return  # Guidance app not available; fail silently.
+    @staticmethod
+    def _available_usernames(applications):
+        """Pick a free username per application with a single lookup of the candidates."""
+        from django.contrib.auth import get_user_model
 
         User = get_user_model()
+        candidates = {}
+        for application in applications:
+            base_username = application._user_defaults()['username']
+            candidates[application.pk] = [base_username, application.email, f'{base_username}-{application.pk}']
+        taken = set(User._default_manager.filter(
+            username__in=[name for names in candidates.values() for name in names],
+        ).values_list('username', flat=True))
+        usernames = {}
+        for pk, names in candidates.items():
+            # The last candidate includes the application id, so it is unique within the batch.
+            usernames[pk] = next((name for name in names if name not in taken), names[-1])
+            taken.add(usernames[pk])
+        return usernames
+
+    @staticmethod
+    def _refresh_guidance(user_ids):
+        from guidance.directory import invalidate_directory, invalidate_mentor_card
+        from guidance.matching import matcher
+
+        invalidate_mentor_card(*user_ids)
+        invalidate_directory()
+        matcher.invalidate()
+
+    def _user_defaults(self, username=None):
         # Derive a username safely from email.
         base_username = (self.email or '').split('@')[0] or self.email
-        user_defaults = {
-            'username': base_username,
+        return {
+            'username': username or base_username,
             'first_name': (self.full_name or '').split(' ')[0],
             'last_name': ' '.join((self.full_name or '').split(' ')[1:]),
             'email': self.email,
         }
-        user, created_user = User.objects.get_or_create(email=self.email, defaults=user_defaults)
-        if created_user:
-            user.set_unusable_password()
-            user.save(update_fields=['password'])
 
-        profile_defaults = {
+    def _profile_defaults(self):
+        return {
             'branch': self.branch,
             'year': self.year,
             'bio': self.expertise or self.why_mentor,
             'mentor_whatsapp': self.mentor_whatsapp,
             'is_approved': True,
         }
-        profile, created_profile = MentorProfile.objects.get_or_create(user=user, defaults=profile_defaults)
-        if not created_profile:
-            profile.branch = self.branch
-            profile.year = self.year
-            profile.bio = self.expertise or self.why_mentor
-            profile.mentor_whatsapp = self.mentor_whatsapp
-            profile.is_approved = True
-            profile.save(update_fields=['branch', 'year', 'bio', 'mentor_whatsapp', 'is_approved'])
 
 
 class Inquiry(models.Model):
@@ -209,3 +298,38 @@ class Inquiry(models.Model):
     
     def __str__(self):
         return f"{self.student_name} - {self.subject[:50]}"
+
+
+class Task(models.Model):
+    """A unit of background work run by ``manage.py run_worker`` (see ``core.taskqueue``)."""
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Registered task, e.g. guidance.tasks.send_credentials")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not claimed before this time")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'pk']
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
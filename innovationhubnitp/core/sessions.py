@@ -0,0 +1,82 @@
+"""
+Session engine that reads sessions from the cache and writes them through to the database.
+
+Set ``SESSION_ENGINE = 'core.sessions'``. This is Django's ``cached_db`` engine
+plus two things: it counts how many session loads the cache answered, and
+``settings.SESSION_CACHE_TTL`` can cap how long a session stays cached. The
+cap matters when the session cache is per-process (local memory): a logout
+in one worker only clears that worker's copy.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+_lock = threading.Lock()
+_counts = Counter()
+
+
+def _record(name):
+    with _lock:
+        _counts[name] += 1
+
+
+def session_stats():
+    """Session loads in this process and the share served from the cache."""
+    with _lock:
+        loads, db_reads = _counts['loads'], _counts['db_reads']
+    return {
+        'loads': loads,
+        'db_reads': db_reads,
+        'hit_ratio': round((loads - db_reads) / loads, 4) if loads else None,
+    }
+
+
+class _BoundedCache:
+    """Proxy to a cache that caps every timeout at ``ttl`` seconds."""
+
+    def __init__(self, cache, ttl):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _timeout(self, timeout):
+        return self.ttl if timeout is None else min(timeout, self.ttl)
+
+    def set(self, key, value, timeout=None):
+        return self.cache.set(key, value, self._timeout(timeout))
+
+    async def aset(self, key, value, timeout=None):
+        return await self.cache.aset(key, value, self._timeout(timeout))
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        ttl = getattr(settings, 'SESSION_CACHE_TTL', None)
+        if ttl is not None:
+            self._cache = _BoundedCache(self._cache, ttl)
+
+    # The database is only read when the cache misses, so every load that
+    # doesn't reach _get_session_from_db() was a cache hit.
+    def load(self):
+        _record('loads')
+        return super().load()
+
+    async def aload(self):
+        _record('loads')
+        return await super().aload()
+
+    def _get_session_from_db(self):
+        _record('db_reads')
+        return super()._get_session_from_db()
+
+    async def _aget_session_from_db(self):
+        _record('db_reads')
+        return await super()._aget_session_from_db()
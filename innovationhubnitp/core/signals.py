@@ -0,0 +1,24 @@
+"""Signal handlers that keep cached site data in sync with admin edits."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .context_processors import invalidate_site_context
+from .fragments import bump_bento_version
+from .models import SiteConfiguration, NavbarLink, BentoCard
+
+
+@receiver(post_save, sender=SiteConfiguration)
+@receiver(post_delete, sender=SiteConfiguration)
+@receiver(post_save, sender=NavbarLink)
+@receiver(post_delete, sender=NavbarLink)
+def clear_site_context(sender, **kwargs):
+    """Invalidate cached site chrome once the admin edit has been committed."""
+    transaction.on_commit(invalidate_site_context)
+
+
+@receiver(post_save, sender=BentoCard)
+@receiver(post_delete, sender=BentoCard)
+def clear_bento_fragment(sender, **kwargs):
+    """Bump the bento grid version so the homepage fragment is re-rendered."""
+    transaction.on_commit(bump_bento_version)
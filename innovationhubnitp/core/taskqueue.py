@@ -0,0 +1,211 @@
+"""
+A small background task queue stored in the ``core.Task`` table.
+
+Functions decorated with ``@task`` in an app's ``tasks`` module are queued
+with ``func.delay(*args, **kwargs)`` and run by ``manage.py run_worker``.
+Arguments must be JSON-serializable. The row is written in the caller's
+transaction, so a task queued inside ``atomic()`` is only visible to workers
+once it commits and disappears if it rolls back.
+
+Tasks run at least once: a worker that dies mid-task leaves it to be claimed
+again. Long tasks call ``checkpoint()`` as they go, which keeps their lock
+fresh and lets the next attempt skip work an earlier one finished.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# A RUNNING task whose worker has been silent this long (no claim or
+# checkpoint) is presumed dead and claimed again.
+LOCK_TIMEOUT = timedelta(minutes=10)
+# Retry delays grow as RETRY_BASE_DELAY * 2 ** (attempt - 1), capped, with jitter.
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+
+_registry = {}
+_running = threading.local()
+
+
+class LockLost(Exception):
+    """The running task was presumed dead and claimed by another worker."""
+
+
+def task(func=None, *, max_attempts=5):
+    """Register ``func`` as a task and give it ``func.delay(*args, **kwargs)``."""
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        _registry[name] = func
+
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+        func.task_name = name
+        func.delay = delay
+        return func
+    return register(func) if func is not None else register
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=5, run_at=None):
+    """
+    Queue the registered task ``name``, or run it inline when ``settings.TASKS_INLINE`` is set.
+
+    Inline tasks run once the current transaction commits, as a worker would see them.
+    """
+    if getattr(settings, 'TASKS_INLINE', False):
+        transaction.on_commit(lambda: get_task(name)(*args, **(kwargs or {})))
+        return None
+    return Task.objects.create(
+        name=name, args=list(args), kwargs=kwargs or {}, max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def get_task(name):
+    if name not in _registry:
+        autodiscover_modules('tasks')
+    return _registry[name]
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker_id, batch_size=10):
+    """
+    Mark up to ``batch_size`` due tasks as running for ``worker_id`` and return them.
+
+    On databases with ``SKIP LOCKED`` (PostgreSQL) candidates are locked so
+    concurrent workers pick disjoint batches without waiting. Elsewhere
+    (SQLite) candidates are read unlocked; in both cases the conditional
+    UPDATE only takes rows still in the state they were read in, so a task is
+    never handed to two workers.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=Task.STATUS_QUEUED, run_at__lte=now)
+        | Q(status=Task.STATUS_RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    )
+    with transaction.atomic():
+        candidates = Task.objects.filter(due).order_by('run_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        Task.objects.filter(due, pk__in=ids).update(
+            status=Task.STATUS_RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.filter(pk__in=ids, status=Task.STATUS_RUNNING, locked_by=worker_id, locked_at=now))
+
+
+def current_task():
+    """Return the ``Task`` this thread is running, or None inline and outside tasks."""
+    return getattr(_running, 'task', None)
+
+
+def checkpoint(result):
+    """
+    Save ``result`` as the running task's progress and renew its lock.
+
+    The next attempt finds it in ``current_task().result``. Call this inside
+    the transaction that commits the work it describes, so the two are saved
+    together. Raises ``LockLost`` when another worker has taken the task over,
+    and does nothing when no task is running.
+    """
+    running = current_task()
+    if running is None:
+        return
+    now = timezone.now()
+    updated = Task.objects.filter(pk=running.pk, status=Task.STATUS_RUNNING, locked_by=running.locked_by).update(
+        result=result, locked_at=now,
+    )
+    if not updated:
+        raise LockLost(f'{running} was claimed by another worker')
+    running.result = result
+    running.locked_at = now
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run_batch(worker_id, batch_size=10):
+    """
+    Claim one batch of tasks and run them; return how many were claimed.
+
+    The whole batch is claimed at once, and each task's lock is renewed as it
+    starts so the time spent on the tasks before it doesn't count against
+    LOCK_TIMEOUT. A task whose lock lapsed anyway and was taken over by another
+    worker is left to that worker.
+    """
+    tasks = claim(worker_id, batch_size)
+    for queued in tasks:
+        if _renew(queued):
+            _run(queued)
+        else:
+            logger.warning('Task %s was taken over by another worker before it started', queued)
+    return len(tasks)
+
+
+def _renew(queued):
+    now = timezone.now()
+    renewed = Task.objects.filter(pk=queued.pk, status=Task.STATUS_RUNNING, locked_by=queued.locked_by).update(
+        locked_at=now,
+    )
+    queued.locked_at = now
+    return bool(renewed)
+
+
+def _run(queued):
+    _running.task = queued
+    try:
+        func = get_task(queued.name)
+        result = func(*queued.args, **queued.kwargs)
+    except LockLost:
+        logger.warning('Task %s was taken over by another worker', queued)
+    except Exception:
+        _record_failure(queued, traceback.format_exc())
+    else:
+        # Results are only kept when they are JSON; anything else is dropped.
+        Task.objects.filter(pk=queued.pk, locked_by=queued.locked_by).update(
+            status=Task.STATUS_DONE, result=result if _is_json(result) else None,
+            locked_by='', finished_at=timezone.now(), last_error='',
+        )
+    finally:
+        _running.task = None
+
+
+def _record_failure(queued, error):
+    if queued.attempts >= queued.max_attempts:
+        logger.error('Task %s failed for good after %d attempts:\n%s', queued, queued.attempts, error)
+        changes = {'status': Task.STATUS_FAILED, 'finished_at': timezone.now()}
+    else:
+        logger.warning('Task %s failed (attempt %d), retrying:\n%s', queued, queued.attempts, error)
+        changes = {'status': Task.STATUS_QUEUED, 'run_at': timezone.now() + retry_delay(queued.attempts)}
+    Task.objects.filter(pk=queued.pk, locked_by=queued.locked_by).update(locked_by='', last_error=error, **changes)
+
+
+def _is_json(value):
+    return value is None or isinstance(value, (str, int, float, bool, list, dict))
+
+
+def purge(older_than):
+    """Delete finished tasks older than ``older_than``; failed tasks are kept for inspection."""
+    cutoff = timezone.now() - older_than
+    deleted, _ = Task.objects.filter(status=Task.STATUS_DONE, finished_at__lt=cutoff).delete()
+    return deleted
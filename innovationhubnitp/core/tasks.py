@@ -0,0 +1,9 @@
+"""Background tasks run by ``manage.py run_worker``."""
+from .models import MentorApplication
+from .taskqueue import task
+
+
+@task
+def sync_mentor_profiles(application_ids):
+    """Create or update the mentor accounts of approved applications."""
+    MentorApplication.sync_profiles(MentorApplication.objects.filter(pk__in=application_ids, is_approved=True))
@@ -1,3 +1,565 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import taskqueue
+from .caching import ChangeLog, TieredCache, reset_local_caches
+from .context_processors import get_site_context, invalidate_site_context, site_cache
+from .forms import InquiryForm
+from .models import BentoCard, Inquiry, MentorApplication, NavbarLink, SiteConfiguration, Task
+from .sessions import SessionStore, session_stats
+from .taskqueue import checkpoint, current_task, task
+from .throttling import MemoryStore, hit
+from .timing import RequestTimingMiddleware
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Check that pages run a fixed number of queries however many rows they show.
+
+    ``assertQueryBudget`` measures a URL after ``grow(ROWS)`` and again after
+    growing the data tenfold, each time with cold caches, and expects
+    exactly ``budget`` queries both times. A budget that only holds at one
+    size is an N+1.
+    """
+
+    ROWS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        # Created on first use otherwise, which would charge one request an INSERT.
+        SiteConfiguration.get_solo()
+
+    def cold_caches(self):
+        cache.clear()
+        reset_local_caches()
+        invalidate_site_context()
+
+    def assertQueryBudget(self, url, budget, grow):
+        for rows in (self.ROWS, self.ROWS * 9):
+            grow(rows)
+            self.cold_caches()
+            with self.assertNumQueries(budget, msg=f'{url} with {rows} more rows'):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def login_superuser(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@nitp.ac.in', 'pw')
+        self.client.force_login(admin)
+        return admin
+
+
+class HomeQueryBudgetTests(QueryBudgetTestCase):
+
+    def grow(self, rows):
+        start = BentoCard.objects.count()
+        BentoCard.objects.bulk_create([
+            BentoCard(title=f'Card {n}', description='About', icon_name='library', order=n)
+            for n in range(start, start + rows)
+        ])
+        NavbarLink.objects.bulk_create([NavbarLink(label=f'Link {n}', url='/', order=n) for n in range(start, start + rows)])
+
+    def test_home(self):
+        # Site configuration, navbar links, bento cards.
+        self.assertQueryBudget(reverse('core:home'), 3, self.grow)
+
+
+class BentoFragmentTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_local_caches()
+        self.card = BentoCard.objects.create(title='Project Library', description='About', icon_name='library')
+
+    def test_grid_is_served_from_the_fragment_cache(self):
+        self.client.get(reverse('core:home'))
+        # A write that sends no signal isn't seen: the cached fragment is served.
+        BentoCard.objects.update(title='Renamed quietly')
+        self.assertContains(self.client.get(reverse('core:home')), 'Project Library')
+
+    def test_editing_a_card_re_renders_the_grid(self):
+        self.client.get(reverse('core:home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.card.title = 'Hardware Library'
+            self.card.save()
+        self.assertContains(self.client.get(reverse('core:home')), 'Hardware Library')
+
+    def test_deleting_a_card_re_renders_the_grid(self):
+        self.client.get(reverse('core:home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.card.delete()
+        self.assertNotContains(self.client.get(reverse('core:home')), 'Project Library')
+
+
+class CoreAdminQueryBudgetTests(QueryBudgetTestCase):
+
+    # Session, user, two counts, the add-permission check on the site
+    # configuration, the page, site chrome, and one per list_filter that
+    # lists distinct values.
+    BUDGETS = {
+        'mentorapplication': 8,
+        'inquiry': 8,
+        'task': 9,
+        'bentocard': 10,
+        'navbarlink': 8,
+    }
+
+    def setUp(self):
+        self.login_superuser()
+
+    def grow(self, rows):
+        start = MentorApplication.objects.count()
+        MentorApplication.objects.bulk_create([
+            MentorApplication(
+                full_name=f'Mentor {n}', email=f'mentor{n}@nitp.ac.in', branch='CSE', year=3,
+                expertise='Web development', mentor_whatsapp='9999999999',
+            )
+            for n in range(start, start + rows)
+        ])
+        Inquiry.objects.bulk_create([
+            Inquiry(
+                student_name=f'Student {n}', email=f'student{n}@nitp.ac.in', subject='Help',
+                message='Hello', student_whatsapp='8888888888',
+            )
+            for n in range(start, start + rows)
+        ])
+        Task.objects.bulk_create([Task(name='core.tasks.sync_mentor_profiles', args=[[n]]) for n in range(start, start + rows)])
+        BentoCard.objects.bulk_create([
+            BentoCard(title=f'Card {n}', description='About', icon_name='library', order=n)
+            for n in range(start, start + rows)
+        ])
+        NavbarLink.objects.bulk_create([NavbarLink(label=f'Link {n}', url='/', order=n) for n in range(start, start + rows)])
+
+    def test_changelists(self):
+        for model, budget in self.BUDGETS.items():
+            with self.subTest(model=model):
+                self.assertQueryBudget(reverse(f'admin:core_{model}_changelist'), budget, self.grow)
+
+
+class SiteContextCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_context()
+
+    # No in-process copy: every call reads the shared cache, as a second worker would.
+    @mock.patch.object(site_cache, 'l1_ttl', 0)
+    def test_load_racing_an_edit_is_not_served_after_it(self):
+        def stale_load():
+            # Another worker's edit commits while this one is still loading the old values.
+            invalidate_site_context()
+            return {'site_config': None, 'nav_links': ['stale']}
+
+        with mock.patch('core.context_processors._load_site_context', side_effect=stale_load):
+            get_site_context()
+
+        self.assertEqual(get_site_context()['nav_links'], [])
+
+
+@override_settings(THROTTLE_RATES={'login': {'ip': '3/m'}})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('core.throttling._store', MemoryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().post(reverse('core:login'), REMOTE_ADDR='10.0.0.1')
+
+    def hit_at(self, seconds):
+        with mock.patch('core.throttling.time.time', return_value=6000 + seconds):
+            return hit('login', self.request)
+
+    def test_limit_within_a_window(self):
+        self.assertEqual([self.hit_at(second) for second in (0, 10, 20)], [0, 0, 0])
+        self.assertEqual(self.hit_at(30), 30)
+
+    def test_window_slides_instead_of_resetting(self):
+        for second in (50, 55, 58):
+            self.hit_at(second)
+        # Just past the boundary nearly all of the previous window still counts...
+        self.assertGreater(self.hit_at(61), 0)
+        # ...and less of it the further the window has moved on.
+        self.assertEqual(self.hit_at(100), 0)
+
+    def test_identities_are_counted_apart(self):
+        for second in range(4):
+            self.hit_at(second)
+        self.request.META['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertEqual(self.hit_at(4), 0)
+
+    def test_throttled_post_is_answered_with_429(self):
+        with override_settings(THROTTLE_RATES={'send_inquiry': {'ip': '3/h'}}):
+            for _ in range(3):
+                self.client.post(reverse('core:send_inquiry'), {'subject': 'Help'})
+            response = self.client.post(reverse('core:send_inquiry'), {'subject': 'Help'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(Inquiry.objects.count(), 0)
+
+
+class EmailLoginTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('core.throttling._store', MemoryStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user('asha', 'Asha.K@nitp.ac.in', 'pw')
+
+    def login(self, email, password='pw'):
+        return self.client.post(reverse('core:login'), {'email': email, 'password': password})
+
+    def test_email_is_matched_case_insensitively(self):
+        self.login('asha.k@NITP.ac.in')
+        self.assertEqual(self.client.session.get('_auth_user_id'), str(self.user.pk))
+
+    def test_wrong_password_and_unknown_email_are_told_apart(self):
+        self.assertContains(self.login('asha.k@nitp.ac.in', 'nope'), 'Invalid email or password.')
+        self.assertContains(self.login('ravi@nitp.ac.in'), 'No account found with this email.')
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_emails_differing_only_in_case_are_rejected(self):
+        User = get_user_model()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('asha2', 'ASHA.K@nitp.ac.in', 'pw')
+        # Blank emails are left out of the constraint.
+        User.objects.create_user('blank1', '', 'pw')
+        User.objects.create_user('blank2', '', 'pw')
+
+
+class MentorApprovalTests(TestCase):
+
+    def apply(self, name, email, expertise='Web development', year=3):
+        return MentorApplication.objects.create(
+            full_name=name, email=email, branch='CSE', year=year, expertise=expertise, mentor_whatsapp='9999999999',
+        )
+
+    def test_approve_creates_and_syncs_accounts_in_bulk(self):
+        User = get_user_model()
+        existing = User.objects.create_user('ravi', 'Ravi@nitp.ac.in', 'pw')
+        User.objects.create_user('asha', 'someone@nitp.ac.in', 'pw')
+        self.apply('Asha Kumari', 'asha@nitp.ac.in')
+        self.apply('Ravi Old', 'ravi@nitp.ac.in', expertise='Old interests', year=2)
+        self.apply('Ravi Singh', 'RAVI@nitp.ac.in', expertise='Embedded systems', year=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            approved = MentorApplication.approve(MentorApplication.objects.all())
+
+        self.assertEqual(approved, 3)
+        self.assertFalse(MentorApplication.objects.filter(Q(is_approved=False) | Q(reviewed_at=None)).exists())
+        # An existing account is matched by email whatever its case; the latest application wins.
+        ravi = existing.mentorprofile
+        self.assertEqual((ravi.bio, ravi.year, ravi.is_approved), ('Embedded systems', 4, True))
+        self.assertEqual(User.objects.filter(email__iexact='ravi@nitp.ac.in').count(), 1)
+        # A new account gets a free username and the applicant's name.
+        asha = User.objects.get(email='asha@nitp.ac.in')
+        self.assertEqual((asha.username, asha.first_name, asha.last_name), ('asha@nitp.ac.in', 'Asha', 'Kumari'))
+        self.assertFalse(asha.has_usable_password())
+        self.assertTrue(asha.mentorprofile.is_approved)
+
+    @override_settings(TASKS_INLINE=False)
+    def test_saving_an_approved_application_queues_a_sync(self):
+        application = self.apply('Asha Kumari', 'asha@nitp.ac.in')
+        self.assertFalse(Task.objects.exists())
+        application.is_approved = True
+        application.save()
+        self.assertEqual(list(Task.objects.values_list('name', 'args')), [('core.tasks.sync_mentor_profiles', [[application.pk]])])
+
+
+class MessageStyleTests(TestCase):
+
+    def render(self, level):
+        return render_to_string(
+            'send_inquiry.html',
+            {'messages': [Message(level, 'Noted')], 'form': InquiryForm()},
+            request=RequestFactory().get('/'),
+        )
+
+    def test_messages_are_styled_by_level(self):
+        self.assertIn('text-green-400', self.render(constants.SUCCESS))
+        self.assertIn('text-red-400', self.render(constants.ERROR))
+        self.assertNotIn('text-red-400', self.render(constants.INFO))
+
+
+class RequestTimingTests(TestCase):
+
+    def respond(self, request):
+        BentoCard.objects.count()
+        return HttpResponse(Template('{% for n in numbers %}{{ n }}{% endfor %}').render(Context({'numbers': [1, 2]})))
+
+    def test_turned_off_at_zero(self):
+        with override_settings(REQUEST_TIMING_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestTimingMiddleware(self.respond)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.25)
+    def test_only_sampled_requests_are_timed(self):
+        middleware = RequestTimingMiddleware(self.respond)
+        request = RequestFactory().get('/')
+        with mock.patch('core.timing.random.random', return_value=0.25):
+            self.assertFalse(middleware(request).has_header('Server-Timing'))
+
+        with mock.patch('core.timing.random.random', return_value=0.1), \
+                self.assertLogs('core.timing', 'INFO') as logs:
+            response = middleware(request)
+        self.assertRegex(
+            response['Server-Timing'], r'^db;dur=\d+\.\d;desc="1 queries", tpl;dur=\d+\.\d, total;dur=\d+\.\d$',
+        )
+        self.assertIn('"queries": 1', logs.output[0])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+    def test_the_view_segment_is_reported_through_the_stack(self):
+        response = self.client.get(reverse('core:home'))
+        self.assertRegex(response['Server-Timing'], r'(^|, )view;dur=')
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache('tests.tiered', ttl=60)
+
+    def put_in_l2(self, value, expires_in, delta=1.0):
+        """Store an entry as another process would have computed it."""
+        self.tiered.l2.set(self.tiered.make_key('k'), (value, time.time() + expires_in, delta), 120)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        start = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        def read(results):
+            start.wait()
+            results.append(self.tiered.get_or_set('k', compute))
+
+        results = []
+        threads = [threading.Thread(target=read, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), results), (1, ['value'] * 8))
+
+    def test_entries_are_refreshed_early_as_expiry_nears(self):
+        self.put_in_l2('old', expires_in=10)
+        with mock.patch('core.caching.random.random', return_value=0.0):
+            self.assertEqual(self.tiered.get_or_set('k', lambda: 'new'), 'old')
+        self.tiered.l1.clear()
+        # A draw this unlucky looks ~20 compute-times ahead, past the expiry.
+        with mock.patch('core.caching.random.random', return_value=1 - 1e-9):
+            self.assertEqual(self.tiered.get_or_set('k', lambda: 'new'), 'new')
+        self.assertEqual(self.tiered.counts['early_refreshes'], 1)
+
+    def test_stale_value_is_served_while_another_process_recomputes(self):
+        self.put_in_l2('old', expires_in=-1)
+        self.tiered.l2.add(f"{self.tiered.make_key('k')}:lock", 1)
+        self.assertEqual(self.tiered.get_or_set('k', mock.Mock(side_effect=AssertionError)), 'old')
+        self.assertEqual(self.tiered.counts['stale_served'], 1)
+
+    def test_bump_invalidates_every_key(self):
+        self.tiered.get_or_set('k', lambda: 'old')
+        self.tiered.bump()
+        self.assertEqual(self.tiered.get_or_set('k', lambda: 'new'), 'new')
+
+    def test_other_processes_see_a_bump_after_l1_ttl(self):
+        other = TieredCache('tests.tiered', ttl=60, l1_ttl=0)
+        self.assertEqual(other.get_or_set('k', lambda: 'old'), 'old')
+        self.tiered.bump()
+        self.assertEqual(other.get_or_set('k', lambda: 'new'), 'new')
+
+
+class ChangeLogTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.log = ChangeLog('tests.changes', max_entries=3)
+
+    def test_changes_since_a_generation_are_replayed_in_order(self):
+        start = self.log.current()
+        self.log.record('a')
+        self.log.record('b')
+        self.assertEqual(self.log.since(start), (start + 2, ['a', 'b']))
+        self.assertEqual(self.log.since(start + 2), (start + 2, []))
+
+    def test_gaps_call_for_a_rebuild(self):
+        start = self.log.current()
+        for change in 'abcd':
+            self.log.record(change)
+        # Too far behind...
+        self.assertIsNone(self.log.since(start))
+        # ...an entry expired...
+        cache.delete(f'changelog:tests.changes:{start + 4}')
+        self.assertIsNone(self.log.since(start + 3))
+        # ...or the whole cache was cleared and the counter started again.
+        cache.clear()
+        self.log.record('e')
+        self.assertIsNone(self.log.since(start + 4))
+
+
+@override_settings(SESSION_CACHE_TTL=60)
+class SessionStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.session['cart'] = 'notes'
+        self.session.save()
+
+    def load(self):
+        before = session_stats()
+        data = SessionStore(self.session.session_key).load()
+        after = session_stats()
+        return data, after['loads'] - before['loads'], after['db_reads'] - before['db_reads']
+
+    def test_saves_write_through_to_the_database(self):
+        self.assertTrue(Session.objects.filter(session_key=self.session.session_key).exists())
+        self.assertIn(self.session.cache_key, caches['default'])
+
+    def test_cached_loads_skip_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.load(), ({'cart': 'notes'}, 1, 0))
+
+    def test_a_cache_miss_reads_the_database_and_refills_the_cache(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.load(), ({'cart': 'notes'}, 1, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.load()[2], 0)
+
+    def test_cached_copies_are_capped_at_the_ttl(self):
+        with mock.patch.object(caches['default'], 'set', wraps=caches['default'].set) as cache_set:
+            self.session.save()
+        self.assertLessEqual(cache_set.call_args.args[2], 60)
+
+
+class PurgeSessionsTests(TestCase):
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{n}', session_data='', expire_date=now - timedelta(days=1)) for n in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertIn('Purged 5 expired sessions in 3 batches', out.getvalue())
+
+
+@task(max_attempts=2)
+def count_queued():
+    return Task.objects.filter(status=Task.STATUS_QUEUED).count()
+
+
+@task
+def take_nine_minutes():
+    # As if this had run for nine minutes; returns how much of the batch is still waiting.
+    waiting = Task.objects.filter(status=Task.STATUS_RUNNING).exclude(pk=current_task().pk)
+    waiting.update(locked_at=timezone.now() - timedelta(minutes=9))
+    return waiting.count()
+
+
+@task
+def lock_age():
+    return (timezone.now() - Task.objects.get(pk=current_task().pk).locked_at).total_seconds()
+
+
+@task
+def slow_then_lose_the_rest():
+    # Runs past LOCK_TIMEOUT, and another worker takes over the rest of the batch.
+    Task.objects.exclude(pk=current_task().pk).update(locked_at=timezone.now() - taskqueue.LOCK_TIMEOUT * 2)
+    taskqueue.claim('worker-b')
+
+
+@task(max_attempts=2)
+def fail_after_checkpoint():
+    checkpoint({'runs': (current_task().result or {}).get('runs', 0) + 1})
+    raise RuntimeError('boom')
+
+
+@task
+def lose_lock():
+    Task.objects.filter(pk=current_task().pk).update(locked_by='other-worker')
+    checkpoint({'runs': 1})
+
+
+@override_settings(TASKS_INLINE=False)
+class TaskQueueTests(TestCase):
+
+    def make_due(self, queued):
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+
+    def test_a_task_is_claimed_by_one_worker(self):
+        count_queued.delay()
+        self.assertEqual(len(taskqueue.claim('worker-a')), 1)
+        self.assertEqual(taskqueue.claim('worker-b'), [])
+
+    def test_a_silent_workers_task_is_claimed_again(self):
+        queued = count_queued.delay()
+        taskqueue.claim('worker-a')
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - taskqueue.LOCK_TIMEOUT - timedelta(seconds=1))
+
+        [reclaimed] = taskqueue.claim('worker-b')
+        self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('worker-b', 2))
+
+    def test_a_batch_is_claimed_at_once_and_renewed_as_each_task_starts(self):
+        first, second = take_nine_minutes.delay(), lock_age.delay()
+        with mock.patch.object(taskqueue, 'claim', wraps=taskqueue.claim) as claim:
+            self.assertEqual(taskqueue.run_batch('worker-a'), 2)
+        self.assertEqual(claim.call_count, 1)
+        # Both were claimed before the first ran, and the second's lock was renewed after.
+        self.assertEqual(Task.objects.get(pk=first.pk).result, 1)
+        self.assertLess(Task.objects.get(pk=second.pk).result, 60)
+
+    def test_a_task_taken_over_while_waiting_in_the_batch_is_skipped(self):
+        slow_then_lose_the_rest.delay()
+        waiting = count_queued.delay()
+        with self.assertLogs('core.taskqueue', 'WARNING'):
+            self.assertEqual(taskqueue.run_batch('worker-a'), 2)
+        waiting.refresh_from_db()
+        self.assertEqual((waiting.status, waiting.locked_by, waiting.result), (Task.STATUS_RUNNING, 'worker-b', None))
+
+    def test_failures_back_off_then_fail_keeping_progress(self):
+        queued = fail_after_checkpoint.delay()
+        with self.assertLogs('core.taskqueue', 'WARNING'):
+            taskqueue.run_batch('worker-a')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, queued.result), (Task.STATUS_QUEUED, 1, {'runs': 1}))
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=20))
+        self.assertIn('boom', queued.last_error)
+        self.assertEqual(taskqueue.run_batch('worker-a'), 0)
+
+        self.make_due(queued)
+        with self.assertLogs('core.taskqueue', 'ERROR'):
+            taskqueue.run_batch('worker-a')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, queued.result), (Task.STATUS_FAILED, 2, {'runs': 2}))
+
+    def test_a_task_taken_over_stops_and_leaves_the_row_alone(self):
+        queued = lose_lock.delay()
+        with self.assertLogs('core.taskqueue', 'WARNING'):
+            taskqueue.run_batch('worker-a')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by, queued.result), (Task.STATUS_RUNNING, 'other-worker', None))
@@ -0,0 +1,215 @@
+"""Per-IP and per-email rate limits checked before any hashing or database work."""
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.shortcuts import render
+from django.utils.module_loading import import_string
+
+DEFAULT_STORE = 'core.throttling.MemoryStore'
+
+# scope -> {identity: rate}. A rate is "<requests>/<window>", where the window
+# is a number of seconds, minutes, hours or days ("30/5m", "3/d").
+# settings.THROTTLE_RATES overrides single scopes.
+DEFAULT_RATES = {
+    'login': {'ip': '30/5m', 'email': '10/5m'},
+    'apply_mentor': {'ip': '10/h', 'email': '3/h'},
+    'send_inquiry': {'ip': '10/h', 'email': '5/h'},
+}
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# Counters kept by MemoryStore before the oldest are dropped, so a flood of
+# distinct IPs or emails cannot grow a worker's memory without bound.
+MAX_MEMORY_ENTRIES = 50_000
+
+
+def parse_rate(rate):
+    """Parse ``"30/5m"`` into ``(30, 300)``: requests allowed per window of seconds."""
+    count, _, period = rate.partition('/')
+    return int(count), int(period[:-1] or 1) * PERIODS[period[-1]]
+
+
+def get_rates(scope):
+    return getattr(settings, 'THROTTLE_RATES', {}).get(scope, DEFAULT_RATES.get(scope, {}))
+
+
+def client_ip(request):
+    """The client address, skipping ``settings.THROTTLE_PROXY_COUNT`` trusted reverse proxies."""
+    proxies = getattr(settings, 'THROTTLE_PROXY_COUNT', 0)
+    if proxies:
+        # Each proxy appends the address it received the request from, so only
+        # the last ``proxies`` entries can be trusted; earlier ones are client-supplied.
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        forwarded = [part for part in forwarded if part]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def posted_email(request):
+    return request.POST.get('email', '').strip().lower()
+
+
+IDENTITIES = {
+    'ip': client_ip,
+    'email': posted_email,
+}
+
+
+class MemoryStore:
+    """Counters in this process's memory; each worker enforces the limits on its own."""
+
+    def __init__(self, max_entries=MAX_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = OrderedDict()  # key -> [count, expires_at]
+        self._shed = Counter()
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= now:
+                entry = self._counters[key] = [0, now + ttl]
+                self._counters.move_to_end(key)
+                while len(self._counters) > self.max_entries:
+                    self._counters.popitem(last=False)
+            entry[0] += 1
+            return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return 0
+            return entry[0]
+
+    def record_shed(self, name):
+        with self._lock:
+            self._shed[name] += 1
+
+    def shed_totals(self, names):
+        with self._lock:
+            return {name: self._shed[name] for name in names}
+
+
+class CacheStore:
+    """Counters in a shared cache (``settings.THROTTLE_CACHE``) so all workers enforce one limit."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def incr(self, key, ttl):
+        self.cache.add(key, 0, ttl)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The counter expired between add() and incr().
+            self.cache.set(key, 1, ttl)
+            return 1
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+    def record_shed(self, name):
+        key = f'throttle:shed:{name}'
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, None)
+
+    def shed_totals(self, names):
+        values = self.cache.get_many([f'throttle:shed:{name}' for name in names])
+        return {name: values.get(f'throttle:shed:{name}', 0) for name in names}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store named by ``settings.THROTTLE_STORE``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(getattr(settings, 'THROTTLE_STORE', DEFAULT_STORE))()
+    return _store
+
+
+def hit(scope, request):
+    """
+    Count a request against every limit of ``scope``.
+
+    Returns 0 if the request may proceed, otherwise the seconds until the
+    tightest exceeded limit frees up. Each limit is a sliding window
+    estimated from two fixed-window counters: the previous window's count,
+    weighted by how much of it still overlaps, plus the current one.
+    Rejected requests are counted too, so a client that keeps retrying
+    stays blocked.
+    """
+    store = get_store()
+    now = time.time()
+    wait = 0
+    for kind, rate in get_rates(scope).items():
+        identity = IDENTITIES[kind](request)
+        if not identity:
+            continue
+        limit, window = parse_rate(rate)
+        index, elapsed = divmod(now, window)
+        # Hashed so arbitrary emails make valid memcached keys.
+        prefix = f'throttle:{scope}:{kind}:{hashlib.sha1(identity.encode()).hexdigest()}'
+        current = store.incr(f'{prefix}:{int(index)}', window * 2)
+        previous = store.get(f'{prefix}:{int(index) - 1}')
+        if previous * (1 - elapsed / window) + current > limit:
+            store.record_shed(f'{scope}:{kind}')
+            wait = max(wait, math.ceil(window - elapsed))
+    return wait
+
+
+def shed_counts():
+    """Return ``{scope: {identity: requests rejected}}`` for every configured limit."""
+    scopes = {**DEFAULT_RATES, **getattr(settings, 'THROTTLE_RATES', {})}
+    totals = get_store().shed_totals([f'{scope}:{kind}' for scope, rates in scopes.items() for kind in rates])
+    counts = {}
+    for name, total in totals.items():
+        scope, kind = name.split(':')
+        counts.setdefault(scope, {})[kind] = total
+    return counts
+
+
+def throttle(scope, template, form_class=None):
+    """
+    Answer POSTs over ``scope``'s limits with a 429 before the view runs.
+
+    The rejection re-renders ``template`` with the submitted values as the
+    initial data of an unbound ``form_class``, so nothing is validated or saved.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+            wait = hit(scope, request)
+            if not wait:
+                return view(request, *args, **kwargs)
+            minutes = math.ceil(wait / 60)
+            messages.error(
+                request,
+                f'Too many attempts. Please try again in {minutes} minute{"s" if minutes != 1 else ""}.',
+            )
+            context = {}
+            if form_class is not None:
+                context['form'] = form_class(initial=request.POST.dict())
+            response = render(request, template, context, status=429)
+            response['Retry-After'] = str(wait)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,138 @@
+"""
+Sampled per-request timing, reported as a ``Server-Timing`` header and a log line.
+
+Enable by setting ``REQUEST_TIMING_SAMPLE_RATE`` to the share of requests to
+time (``1.0`` times all of them). At ``0`` the middleware removes itself from
+the stack at startup; requests that aren't sampled only pay for one
+``random()`` call, since the template and SQL hooks check a context variable
+and return straight away.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Durations (seconds) collected while one sampled request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.segments = {'db': 0.0, 'tpl': 0.0}
+        self.rendering = False
+
+    def add(self, name, seconds):
+        self.segments[name] = self.segments.get(name, 0.0) + seconds
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` segment, if it is sampled."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+_template_timer_installed = False
+
+
+def _install_template_timer():
+    """Time the outermost ``Template.render`` of sampled requests; includes and extends are nested inside it."""
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context):
+        timing = _current.get()
+        if timing is None or timing.rendering:
+            return original(self, context)
+        timing.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            timing.rendering = False
+            timing.add('tpl', time.perf_counter() - started)
+
+    Template.render = render
+    _template_timer_installed = True
+
+
+class RequestTimingMiddleware:
+    """Time SQL, template rendering, the view and any ``timed()`` blocks for a sample of requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        _install_template_timer()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        finished = time.perf_counter()
+        if timing.view_started is not None:
+            timing.add('view', finished - timing.view_started)
+        timing.add('total', finished - timing.started)
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{timing.queries} queries"' if name == 'db' else '')
+            for name, seconds in timing.segments.items()
+        )
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': timing.queries,
+            **{f'{name}_ms': round(seconds * 1000, 1) for name, seconds in timing.segments.items()},
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current.get()
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+        return None
@@ -11,4 +11,5 @@ urlpatterns = [
     path('apply-mentor/', views.apply_mentor, name='apply_mentor'),
     path('send-inquiry/', views.send_inquiry, name='send_inquiry'),
     path('healthz/', views.health, name='health'),
+    path('ops/stats/', views.ops_stats, name='ops_stats'),
 ]
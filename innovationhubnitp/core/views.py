@@ -1,11 +1,17 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.generic import TemplateView
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from .backends import users_with_email
+from .caching import cache_stats
 from .models import BentoCard, MentorApplication, Inquiry
 from .forms import MentorApplicationForm, InquiryForm
+from .fragments import BENTO_FRAGMENT_TTL, get_bento_version
+from .sessions import session_stats
+from .throttling import shed_counts, throttle
 
 
 class HomeView(TemplateView):
@@ -14,18 +20,24 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Lazy queryset: only evaluated when the cached grid fragment is re-rendered.
         context['bento_cards'] = BentoCard.objects.filter(is_active=True)
+        context['bento_version'] = get_bento_version()
+        context['bento_ttl'] = BENTO_FRAGMENT_TTL
         return context
 
 
 def home(request):
     """Simple function-based view for homepage."""
     context = {
-        'bento_cards': BentoCard.objects.filter(is_active=True)
+        'bento_cards': BentoCard.objects.filter(is_active=True),
+        'bento_version': get_bento_version(),
+        'bento_ttl': BENTO_FRAGMENT_TTL,
     }
     return render(request, 'home.html', context)
 
 
+@throttle('apply_mentor', 'apply_mentor.html', MentorApplicationForm)
 def apply_mentor(request):
     """View for mentor application form."""
     if request.method == 'POST':
@@ -44,6 +56,7 @@ def apply_mentor(request):
     return render(request, 'apply_mentor.html', {'form': form})
 
 
+@throttle('send_inquiry', 'send_inquiry.html', InquiryForm)
 def send_inquiry(request):
     """View for student inquiry/contact form."""
     if request.method == 'POST':
@@ -75,6 +88,7 @@ def _redirect_after_login(user):
     return redirect('guidance:guidance_home')
 
 
+@throttle('login', 'login.html')
 def login_view(request):
     """Login page for students and mentors with @nitp.ac.in email."""
     if request.user.is_authenticated:
@@ -89,18 +103,15 @@ def login_view(request):
             messages.error(request, 'Please use your @nitp.ac.in email address.')
             return render(request, 'login.html')
         
-        # Authenticate using email as username (Django default)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        try:
-            user = User.objects.get(email=email)
-            user = authenticate(request, username=user.username, password=password)
-            if user is not None:
-                login(request, user)
-                return _redirect_after_login(user)
-            else:
-                messages.error(request, 'Invalid email or password.')
-        except User.DoesNotExist:
+        # EmailBackend resolves and verifies the user in one indexed lookup.
+        user = authenticate(request, email=email, password=password)
+        if user is not None:
+            login(request, user)
+            return _redirect_after_login(user)
+        # Only failed logins pay for the extra existence check.
+        if users_with_email(email).exists():
+            messages.error(request, 'Invalid email or password.')
+        else:
             messages.error(request, 'No account found with this email. Please sign up first.')
             return render(request, 'login.html')
     
@@ -118,3 +129,13 @@ def logout_view(request):
 def health(request):
     """Lightweight health check endpoint for uptime pings."""
     return HttpResponse('ok')
+
+
+@staff_member_required
+def ops_stats(request):
+    """Throttle rejections and, for this worker process, session and tiered cache hit ratios."""
+    return JsonResponse({
+        'throttle_shed': shed_counts(),
+        'sessions': session_stats(),
+        'caches': cache_stats(),
+    })
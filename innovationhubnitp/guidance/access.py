@@ -0,0 +1,25 @@
+"""Cached participant lookups for chat endpoints that are hit on every poll."""
+from django.core.cache import cache
+
+from .models import MentorRequest
+
+CHAT_ACCESS_CACHE_KEY = 'guidance:chat_access:{}'
+CHAT_ACCESS_CACHE_TTL = 60 * 60
+
+
+def chat_participants(request_id):
+	"""Return ``(student_id, mentor_user_id)`` for an approved chat, or ``None``."""
+	key = CHAT_ACCESS_CACHE_KEY.format(request_id)
+	participants = cache.get(key)
+	if participants is None:
+		row = MentorRequest.objects.filter(
+			pk=request_id, status=MentorRequest.STATUS_APPROVED,
+		).values_list('student_id', 'mentor__user_id').first()
+		# Cache misses too, so polling a pending or unknown chat stays query-free.
+		participants = tuple(row) if row else ()
+		cache.set(key, participants, CHAT_ACCESS_CACHE_TTL)
+	return participants or None
+
+
+def invalidate_chat_access(*request_ids):
+	cache.delete_many([CHAT_ACCESS_CACHE_KEY.format(request_id) for request_id in request_ids])
@@ -0,0 +1,113 @@
+"""Issue and mail login credentials to approved mentors in bulk."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+from .directory import invalidate_directory, invalidate_mentor_card
+from .matching import matcher
+from .models import MentorProfile, validate_nitp_email
+
+CREDENTIALS_SUBJECT = 'Innovation Hub | Mentor Access Approved'
+# PBKDF2 runs in C without the GIL, so threads hash in parallel.
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+# Mailed passwords are saved in batches of this many.
+SAVE_EVERY = 20
+
+
+def credentials_message(email, password, connection=None):
+	return EmailMessage(
+		subject=CREDENTIALS_SUBJECT,
+		body=(
+			"Hi, your mentor profile is approved.\n"
+			f"Email: {email}\n"
+			f"Password: {password}\n"
+			"Login via /admin/login/ or designated portal."
+		),
+		from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@nitp.ac.in'),
+		to=[email],
+		connection=connection,
+	)
+
+
+def issue_credentials(profiles, on_saved=None):
+	"""
+	Give each mentor in ``profiles`` a new random password, mail it and approve them.
+
+	Passwords are hashed in a thread pool and every message goes out over one
+	mail connection. A mentor's password and approval are only saved once
+	their message was accepted, so a failed delivery leaves the old password
+	working and the mentor can simply be selected again. Accepted mentors are
+	saved every SAVE_EVERY messages rather than at the end, so a run cut short
+	keeps the passwords it already mailed; ``on_saved(emails)`` is called in
+	each save's transaction. Returns ``(sent_emails, [(email, reason), ...])``.
+	"""
+	failures = []
+	pending = []
+	for profile in profiles:
+		try:
+			validate_nitp_email(profile.user)
+		except ValidationError as exc:
+			failures.append((profile.user.email, ' '.join(exc.messages)))
+			continue
+		pending.append(profile)
+	if not pending:
+		return [], failures
+
+	passwords = [get_random_string(12) for _ in pending]
+	with ThreadPoolExecutor(max_workers=min(HASH_WORKERS, len(pending))) as pool:
+		hashes = list(pool.map(make_password, passwords))
+
+	sent = []
+	delivered = []
+	# A server that can't be reached raises here, before any password changes.
+	connection = get_connection()
+	connection.open()
+	try:
+		for profile, password, encoded in zip(pending, passwords, hashes):
+			try:
+				credentials_message(profile.user.email, password, connection).send()
+			except Exception as exc:
+				failures.append((profile.user.email, _reason(exc)))
+				continue
+			profile.user.password = encoded
+			delivered.append(profile)
+			if len(delivered) >= SAVE_EVERY:
+				sent += _save_delivered(delivered, on_saved)
+				delivered = []
+	finally:
+		connection.close()
+
+	if delivered:
+		sent += _save_delivered(delivered, on_saved)
+	return sent, failures
+
+
+def _save_delivered(profiles, on_saved):
+	users = [profile.user for profile in profiles]
+	emails = [user.email for user in users]
+	with transaction.atomic():
+		get_user_model()._default_manager.bulk_update(users, ['password'])
+		MentorProfile.objects.filter(pk__in=[profile.pk for profile in profiles]).update(is_approved=True)
+		if on_saved is not None:
+			on_saved(emails)
+		# Bulk writes send no signals, so refresh the directory caches here.
+		user_ids = [user.pk for user in users]
+		transaction.on_commit(lambda: _refresh_directory(user_ids))
+	return emails
+
+
+def _reason(exc):
+	return str(exc) or exc.__class__.__name__
+
+
+def _refresh_directory(user_ids):
+	invalidate_mentor_card(*user_ids)
+	invalidate_directory()
+	matcher.invalidate()
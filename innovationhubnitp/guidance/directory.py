@@ -0,0 +1,42 @@
+"""Cached, pre-rendered mentor cards for the guidance directory."""
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.caching import TieredCache
+
+from .models import MentorProfile
+
+# Cards are keyed by the mentor's user id so a User edit can clear its card
+# without looking the profile up. Bump the version when the card template changes.
+MENTOR_CARD_CACHE_KEY = 'guidance:mentor_card:v1:{}'
+MENTOR_CARD_CACHE_TTL = 60 * 60 * 24
+MENTOR_CARD_TEMPLATE = 'guidance/mentor_card.html'
+
+# Pages of the approved-mentor listing; bumped when a profile changes.
+directory_cache = TieredCache('guidance.directory', ttl=60 * 60)
+
+
+def mentor_cards(user_ids):
+	"""Return ``{user_id: html}`` for the given mentors, rendering only cache misses."""
+	keys = {user_id: MENTOR_CARD_CACHE_KEY.format(user_id) for user_id in user_ids}
+	cached = cache.get_many(keys.values())
+	cards = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+
+	missing = [user_id for user_id in user_ids if user_id not in cards]
+	if missing:
+		rendered = {
+			mentor.user_id: render_to_string(MENTOR_CARD_TEMPLATE, {'mentor': mentor})
+			for mentor in MentorProfile.objects.filter(user_id__in=missing).select_related('user')
+		}
+		cache.set_many({keys[user_id]: html for user_id, html in rendered.items()}, MENTOR_CARD_CACHE_TTL)
+		cards.update(rendered)
+	return {user_id: mark_safe(html) for user_id, html in cards.items()}
+
+
+def invalidate_mentor_card(*user_ids):
+	cache.delete_many([MENTOR_CARD_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+def invalidate_directory():
+	directory_cache.bump()
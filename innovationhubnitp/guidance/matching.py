@@ -0,0 +1,204 @@
+"""TF-IDF matching of student queries against mentor bios and expertise."""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from core.caching import ChangeLog
+
+from .models import MentorProfile
+
+# Mentor lookups re-indexed in some process, or None for "rebuild everything".
+changes = ChangeLog('guidance.matcher')
+
+STOP_WORDS = frozenset({
+	'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from', 'help', 'i', 'in',
+	'is', 'it', 'me', 'my', 'of', 'on', 'or', 'the', 'to', 'with', 'want', 'need', 'you', 'your',
+})
+
+_TOKEN_RE = re.compile(r'[a-z0-9+#]+')
+
+
+def tokenize(text):
+	"""Lowercase terms, keeping tokens like "c++" and "c#" intact."""
+	return [token for token in _TOKEN_RE.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+class MentorMatcher:
+	"""
+	Sparse TF-IDF vectors of approved mentors, scored by cosine similarity.
+
+	Each mentor document is the profile bio plus the expertise of their
+	approved applications. Vectors are stored as postings (term -> {mentor:
+	tf weight}), so a query only touches mentors sharing one of its terms.
+	Single mentors are re-indexed by the signal handlers in
+	``guidance.signals``, and each re-index is recorded in ``changes``;
+	other processes replay the mentors recorded since their last look before
+	the next match, and only rebuild after an ``invalidate()`` or when they
+	have fallen too far behind.
+	"""
+
+	def __init__(self):
+		self._lock = threading.RLock()
+		self._reset()
+
+	def _reset(self):
+		self.built = False
+		self.generation = None
+		self.postings = defaultdict(dict)  # term -> {profile_id: 1 + log(tf)}
+		self.doc_terms = {}                # profile_id -> {term: 1 + log(tf)}
+		self.user_ids = {}                 # profile_id -> user_id
+		self.norms = {}                    # profile_id -> L2 norm under the current idf
+		self.norms_stale = True
+
+	# -- maintenance -----------------------------------------------------
+
+	def build(self):
+		"""(Re)build the whole matrix with one query for profiles and one for applications."""
+		with self._lock:
+			self._reset()
+			# Read first: a change recorded during the build is replayed after it.
+			generation = changes.current()
+			profiles = list(
+				MentorProfile.objects.filter(is_approved=True).values_list('pk', 'user_id', 'bio', 'user__email')
+			)
+			expertise = self._expertise_by_email((email for _, _, _, email in profiles), everyone=True)
+			for pk, user_id, bio, email in profiles:
+				self._add(pk, user_id, bio, expertise.get((email or '').lower(), ''))
+			self.built = True
+			self.generation = generation
+
+	def ensure_current(self):
+		"""Build the matrix, or replay the mentors other processes re-indexed since."""
+		with self._lock:
+			caught_up = changes.since(self.generation) if self.built else None
+			if caught_up is None or None in caught_up[1]:
+				self.build()
+				return
+			generation, lookups = caught_up
+			for lookup in lookups:
+				self._apply(lookup)
+			self.generation = generation
+
+	def update_mentor(self, **lookup):
+		"""Re-index the mentor matching ``lookup`` (``pk=`` or ``user_id=``), or drop it."""
+		with self._lock:
+			if self.built:
+				self._apply(lookup)
+			self._record(lookup)
+
+	def update_email(self, email):
+		"""Re-index the mentor whose account uses ``email`` (after an application edit)."""
+		self.update_mentor(user__email__iexact=email)
+
+	def invalidate(self):
+		"""Rebuild on next use in every process, after bulk writes that send no signals."""
+		with self._lock:
+			self._reset()
+			self._record(None)
+
+	def _record(self, lookup):
+		generation = changes.record(lookup)
+		# Only skip ahead when no other process recorded a change in between.
+		if self.built and generation == self.generation + 1:
+			self.generation = generation
+
+	def _apply(self, lookup):
+		rows = list(MentorProfile.objects.filter(**lookup).values_list(
+			'pk', 'user_id', 'bio', 'user__email', 'is_approved',
+		))
+		for pk, _, _, _, _ in rows:
+			self._remove(pk)
+		if 'pk' in lookup and not rows:
+			self._remove(lookup['pk'])
+		approved = [row for row in rows if row[4]]
+		if approved:
+			expertise = self._expertise_by_email(email for _, _, _, email, _ in approved)
+			for pk, user_id, bio, email, _ in approved:
+				self._add(pk, user_id, bio, expertise.get((email or '').lower(), ''))
+
+	@staticmethod
+	def _expertise_by_email(emails, everyone=False):
+		"""Map lowercased email -> approved applications' expertise text."""
+		from core.models import MentorApplication
+
+		emails = {email.lower() for email in emails if email}
+		if not emails:
+			return {}
+		applications = MentorApplication.objects.filter(is_approved=True)
+		if not everyone:
+			# Emails are stored as typed, so match them case-insensitively.
+			applications = applications.filter(reduce(or_, (Q(email__iexact=email) for email in emails)))
+		expertise = defaultdict(list)
+		for email, text in applications.values_list('email', 'expertise'):
+			if email and email.lower() in emails:
+				expertise[email.lower()].append(text)
+		return {email: ' '.join(texts) for email, texts in expertise.items()}
+
+	def _add(self, pk, user_id, bio, expertise):
+		counts = Counter(tokenize(bio) + tokenize(expertise))
+		if not counts:
+			return
+		weights = {term: 1.0 + math.log(count) for term, count in counts.items()}
+		self.doc_terms[pk] = weights
+		self.user_ids[pk] = user_id
+		for term, weight in weights.items():
+			self.postings[term][pk] = weight
+		self.norms_stale = True
+
+	def _remove(self, pk):
+		terms = self.doc_terms.pop(pk, None)
+		if terms is None:
+			return
+		del self.user_ids[pk]
+		for term in terms:
+			docs = self.postings[term]
+			docs.pop(pk, None)
+			if not docs:
+				del self.postings[term]
+		self.norms_stale = True
+
+	def _idf(self, term):
+		# Smoothed idf, so a term used by every mentor still counts a little.
+		return math.log((1 + len(self.doc_terms)) / (1 + len(self.postings.get(term, ())))) + 1.0
+
+	def _refresh_norms(self):
+		# Adding or removing a mentor shifts every idf, so norms are recomputed
+		# in one pass on the next query instead of on every update.
+		idf = {term: self._idf(term) for term in self.postings}
+		self.norms = {
+			pk: math.sqrt(sum((weight * idf[term]) ** 2 for term, weight in terms.items()))
+			for pk, terms in self.doc_terms.items()
+		}
+		self.norms_stale = False
+
+	# -- querying --------------------------------------------------------
+
+	def match(self, query, limit=None):
+		"""Return ``[(profile_id, user_id, score)]`` ordered by cosine similarity to ``query``."""
+		self.ensure_current()
+		with self._lock:
+			if self.norms_stale:
+				self._refresh_norms()
+			query_terms = Counter(term for term in tokenize(query) if term in self.postings)
+			scores = Counter()
+			for term, count in query_terms.items():
+				idf = self._idf(term)
+				query_weight = (1.0 + math.log(count)) * idf
+				for pk, weight in self.postings[term].items():
+					scores[pk] += query_weight * weight * idf
+			# The query norm is the same for every mentor, so it doesn't change the order.
+			ranked = sorted(
+				((pk, score / self.norms[pk]) for pk, score in scores.items()),
+				key=lambda item: (-item[1], item[0]),
+			)
+			if limit is not None:
+				ranked = ranked[:limit]
+			return [(pk, self.user_ids[pk], score) for pk, score in ranked]
+
+
+matcher = MentorMatcher()
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guidance', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['request', 'sent_at'], name='guidance_ch_request_e7da96_idx'),
+        ),
+    ]
@@ -84,6 +84,9 @@ class ChatMessage(models.Model):
 
 	class Meta:
 		ordering = ['sent_at']
+		indexes = [
+			models.Index(fields=['request', 'sent_at']),
+		]
 
 	def __str__(self):
 		return f"{self.sender} @ {self.sent_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,62 @@
+"""Pagination helpers for chat history and the mentor dashboard."""
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'guidance.chat_cursor'
+
+
+def encode_cursor(message):
+	"""Build an opaque, tamper-proof cursor pointing just before ``message``."""
+	return signing.dumps([message.sent_at.isoformat(), message.pk], salt=CURSOR_SALT)
+
+
+def decode_cursor(value):
+	"""Return ``(sent_at, pk)`` for a cursor, or None if missing/invalid."""
+	if not value:
+		return None
+	try:
+		sent_at, pk = signing.loads(value, salt=CURSOR_SALT)
+		sent_at = parse_datetime(sent_at)
+	except (signing.BadSignature, ValueError, TypeError):
+		return None
+	if sent_at is None:
+		return None
+	return sent_at, pk
+
+
+def latest_messages(queryset, cursor, per_page):
+	"""
+	Return the newest ``per_page`` messages before the cursor, oldest first, plus
+	the cursor for the page before them.
+
+	Walks the (request, sent_at) index backwards with ``LIMIT per_page + 1``, so
+	opening a chat costs the same however long its history is.
+	"""
+	if cursor is not None:
+		sent_at, pk = cursor
+		queryset = queryset.filter(Q(sent_at__lt=sent_at) | Q(sent_at=sent_at, pk__lt=pk))
+	page = list(queryset.order_by('-sent_at', '-pk')[:per_page + 1])
+	older_cursor = None
+	if len(page) > per_page:
+		page = page[:per_page]
+		older_cursor = encode_cursor(page[-1])
+	page.reverse()
+	return page, older_cursor
+
+
+def page_slice(queryset, page, per_page):
+	"""
+	Return ``(items, page, has_next)`` for a 1-based page number, with ``page``
+	clamped to a valid value.
+
+	Fetches ``per_page + 1`` rows in one query instead of running a separate
+	COUNT like ``Paginator`` does.
+	"""
+	try:
+		page = max(int(page), 1)
+	except (TypeError, ValueError):
+		page = 1
+	start = (page - 1) * per_page
+	items = list(queryset[start:start + per_page + 1])
+	return items[:per_page], page, len(items) > per_page
@@ -0,0 +1,135 @@
+"""Publish/subscribe fan-out of chat messages to connected clients."""
+import abc
+import asyncio
+import contextlib
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'guidance.realtime.InProcessBroker'
+# Messages buffered per connection before a slow client is dropped; it then
+# reconnects and catches up from the database using Last-Event-ID.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def chat_channel(request_id):
+	return f'chat:{request_id}'
+
+
+def message_payload(message):
+	"""Serialize a ChatMessage the way clients render it."""
+	sender = message.sender
+	return {
+		'id': message.id,
+		'sender_id': message.sender_id,
+		'sender': sender.get_full_name() or sender.email,
+		'message': message.message,
+		'sent_at': message.sent_at,
+	}
+
+
+def sse_event(payload):
+	"""Format a payload as a server-sent ``message`` event carrying its id."""
+	data = json.dumps(payload, cls=DjangoJSONEncoder)
+	return f"id: {payload['id']}\nevent: message\ndata: {data}\n\n"
+
+
+class ChatBroker(abc.ABC):
+	"""
+	Interface for chat fan-out.
+
+	``publish`` is called from synchronous code once a message is committed;
+	``subscribe`` is an async context manager yielding a subscription whose
+	``get(timeout)`` returns the next payload, or ``None`` on timeout. A
+	subscription sets ``overflowed`` when it had to drop payloads.
+	Multi-process deployments point ``settings.CHAT_BROKER`` at a broker
+	that relays between workers.
+	"""
+
+	@abc.abstractmethod
+	def publish(self, channel, payload):
+		pass
+
+	@abc.abstractmethod
+	def subscribe(self, channel):
+		pass
+
+
+class _QueueSubscription:
+	def __init__(self, loop, maxsize):
+		self.loop = loop
+		self.queue = asyncio.Queue(maxsize)
+		self.overflowed = False
+
+	def deliver(self, payload):
+		try:
+			self.loop.call_soon_threadsafe(self._put, payload)
+		except RuntimeError:
+			# The subscriber's event loop has already shut down.
+			pass
+
+	def _put(self, payload):
+		try:
+			self.queue.put_nowait(payload)
+		except asyncio.QueueFull:
+			self.overflowed = True
+
+	async def get(self, timeout=None):
+		try:
+			return await asyncio.wait_for(self.queue.get(), timeout)
+		except TimeoutError:
+			return None
+
+
+class InProcessBroker(ChatBroker):
+	"""Fan out to subscribers in this process only (one ASGI worker)."""
+
+	def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+		self.queue_size = queue_size
+		self._lock = threading.Lock()
+		self._channels = defaultdict(set)
+
+	def publish(self, channel, payload):
+		"""Deliver ``payload`` to every subscriber of ``channel``; return how many."""
+		with self._lock:
+			subscribers = list(self._channels.get(channel, ()))
+		for subscription in subscribers:
+			subscription.deliver(payload)
+		return len(subscribers)
+
+	@contextlib.asynccontextmanager
+	async def subscribe(self, channel):
+		subscription = _QueueSubscription(asyncio.get_running_loop(), self.queue_size)
+		with self._lock:
+			self._channels[channel].add(subscription)
+		try:
+			yield subscription
+		finally:
+			with self._lock:
+				subscribers = self._channels.get(channel)
+				if subscribers is not None:
+					subscribers.discard(subscription)
+					if not subscribers:
+						del self._channels[channel]
+
+	def subscriber_count(self, channel):
+		with self._lock:
+			return len(self._channels.get(channel, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+	"""Return the process-wide broker named by ``settings.CHAT_BROKER``."""
+	global _broker
+	if _broker is None:
+		with _broker_lock:
+			if _broker is None:
+				_broker = import_string(getattr(settings, 'CHAT_BROKER', DEFAULT_BROKER))()
+	return _broker
@@ -0,0 +1,103 @@
+"""Signal handlers that push new chat messages and keep cached guidance data current."""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .access import invalidate_chat_access
+from .directory import invalidate_directory, invalidate_mentor_card
+from .matching import matcher
+from .models import ChatMessage, MentorProfile, MentorRequest
+from .realtime import chat_channel, get_broker, message_payload
+
+
+@receiver(post_save, sender=ChatMessage)
+def publish_chat_message(sender, instance, created, **kwargs):
+	"""Fan a new message out once it is committed, so subscribers can't see a rolled-back row."""
+	if not created:
+		return
+	channel = chat_channel(instance.request_id)
+	payload = message_payload(instance)
+	transaction.on_commit(lambda: get_broker().publish(channel, payload))
+
+
+@receiver(post_save, sender=MentorRequest)
+@receiver(post_delete, sender=MentorRequest)
+def clear_chat_access(sender, instance, **kwargs):
+	"""Approval, reassignment or deletion changes who may read the chat."""
+	request_id = instance.pk
+	transaction.on_commit(lambda: invalidate_chat_access(request_id))
+
+
+@receiver(post_save, sender=MentorProfile)
+def clear_mentor_chat_access(sender, instance, created, **kwargs):
+	"""The cached participants include the mentor's user id."""
+	if created:
+		return
+	request_ids = list(instance.requests.values_list('pk', flat=True))
+	if request_ids:
+		transaction.on_commit(lambda: invalidate_chat_access(*request_ids))
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_delete, sender=MentorProfile)
+def clear_mentor_card(sender, instance, **kwargs):
+	user_id = instance.user_id
+	transaction.on_commit(lambda: invalidate_mentor_card(user_id))
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_delete, sender=MentorProfile)
+def clear_directory(sender, **kwargs):
+	"""Approval and removal change which mentors each listing page holds."""
+	transaction.on_commit(invalidate_directory)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def clear_user_mentor_card(sender, instance, update_fields=None, **kwargs):
+	"""Cards show the user's name and email; logins only touch last_login."""
+	if update_fields is not None and set(update_fields) <= {'last_login'}:
+		return
+	user_id = instance.pk
+	transaction.on_commit(lambda: invalidate_mentor_card(user_id))
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_delete, sender=MentorProfile)
+def reindex_mentor(sender, instance, **kwargs):
+	"""Approval, bio edits and removals change the mentor's match vector."""
+	profile_id = instance.pk
+	transaction.on_commit(lambda: matcher.update_mentor(pk=profile_id))
+
+
+@receiver(post_save, sender='core.MentorApplication')
+@receiver(post_delete, sender='core.MentorApplication')
+def reindex_applicant(sender, instance, **kwargs):
+	"""Application expertise is part of the mentor's match vector."""
+	email = instance.email
+	if email:
+		transaction.on_commit(lambda: matcher.update_email(email))
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_user_email(sender, instance, **kwargs):
+	# Read from __dict__ so a deferred email isn't fetched just for this.
+	instance._matched_email = instance.__dict__.get('email')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reindex_user_mentor(sender, instance, created, update_fields=None, **kwargs):
+	"""
+	Expertise is joined on the account email, so an email change moves the match vector.
+
+	Nothing else on the user is indexed, and a new user has no profile yet.
+	"""
+	if update_fields is not None and 'email' not in update_fields:
+		return
+	email = instance.__dict__.get('email')
+	changed = email != instance._matched_email
+	instance._matched_email = email
+	if created or not changed:
+		return
+	user_id = instance.pk
+	transaction.on_commit(lambda: matcher.update_mentor(user_id=user_id))
@@ -0,0 +1,25 @@
+"""Background tasks run by ``manage.py run_worker``."""
+from core.taskqueue import checkpoint, current_task, task
+
+from .credentials import issue_credentials
+from .models import MentorProfile
+
+
+@task
+def send_credentials(profile_ids):
+	"""
+	Mail new passwords to mentors; the task result lists who got one and who didn't.
+
+	Who was mailed is checkpointed with each saved batch of passwords, so a
+	retry, or a worker taking over a stalled run, doesn't mail them again.
+	"""
+	running = current_task()
+	sent = list(((running and running.result) or {}).get('sent', []))
+	profiles = MentorProfile.objects.filter(pk__in=profile_ids).exclude(user__email__in=sent).select_related('user')
+
+	def saved(emails):
+		sent.extend(emails)
+		checkpoint({'sent': sent, 'failed': []})
+
+	_, failures = issue_credentials(profiles, on_saved=saved)
+	return {'sent': sent, 'failed': [f'{email}: {reason}' for email, reason in failures]}
@@ -1,3 +1,427 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import taskqueue
+from core.caching import reset_local_caches
+from core.models import MentorApplication, Task
+from core.tests import QueryBudgetTestCase
+
+from . import views
+from .credentials import issue_credentials
+from .directory import mentor_cards
+from .matching import MentorMatcher, matcher
+from .models import ChatMessage, MentorProfile, MentorRequest
+from .pagination import decode_cursor, encode_cursor, latest_messages
+from .realtime import ChatBroker, InProcessBroker, chat_channel, get_broker
+from .tasks import send_credentials
+
+User = get_user_model()
+
+
+class GuidanceQueryBudgetTests(QueryBudgetTestCase):
+
+	def setUp(self):
+		self.student = User.objects.create_user('student', 'student@nitp.ac.in', 'pw')
+		self.mentor = MentorProfile.objects.create(
+			user=User.objects.create_user('mentor', 'mentor@nitp.ac.in', 'pw', first_name='Asha'),
+			branch='CSE', year=4, is_approved=True,
+		)
+		self.chat = MentorRequest.objects.create(
+			student=self.student, mentor=self.mentor, message='Hi', student_whatsapp='8888888888',
+			status=MentorRequest.STATUS_APPROVED,
+		)
+
+	def grow(self, rows):
+		"""Add mentors the student has chats with, students asking the mentor, and chat messages."""
+		start = User.objects.count()
+		users = User.objects.bulk_create([
+			User(username=f'user{n}', email=f'user{n}@nitp.ac.in', first_name=f'User {n}')
+			for n in range(start, start + rows * 3)
+		])
+		mentors = MentorProfile.objects.bulk_create([
+			MentorProfile(user=user, branch='ECE', year=3, bio='Embedded systems', is_approved=True)
+			for user in users[:rows]
+		])
+		requests = MentorRequest.objects.bulk_create(
+			[
+				MentorRequest(
+					student=self.student, mentor=mentor, message='Hi', student_whatsapp='8888888888',
+					status=MentorRequest.STATUS_APPROVED,
+				)
+				for mentor in mentors
+			]
+			+ [
+				MentorRequest(
+					student=student, mentor=self.mentor, message='Hi', student_whatsapp='8888888888',
+					status=MentorRequest.STATUS_PENDING if n % 2 else MentorRequest.STATUS_APPROVED,
+				)
+				for n, student in enumerate(users[rows:])
+			]
+		)
+		ChatMessage.objects.bulk_create(
+			[ChatMessage(request=self.chat, sender=sender, message='Hello') for sender in (self.student, self.mentor.user) * rows]
+			+ [ChatMessage(request=request, sender=request.student, message='Hello') for request in requests]
+		)
+
+	def test_directory(self):
+		# Directory page, cards, site chrome.
+		self.assertQueryBudget(reverse('guidance:guidance_home'), 4, self.grow)
+
+	def test_directory_signed_in(self):
+		# Adds the session, the user and the student's open chats.
+		self.client.force_login(self.student)
+		self.assertQueryBudget(reverse('guidance:guidance_home'), 7, self.grow)
+
+	def test_mentor_dashboard(self):
+		# Session, user, profile, pending page, chats page, site chrome.
+		self.client.force_login(self.mentor.user)
+		self.assertQueryBudget(reverse('guidance:mentor_dashboard'), 7, self.grow)
+
+	def test_chat(self):
+		# Session, user, the request with both people, the latest messages, site chrome.
+		self.client.force_login(self.student)
+		self.assertQueryBudget(reverse('guidance:chat', args=[self.chat.pk]), 6, self.grow)
+
+	# As for the core changelists: the rows arrive with their users in the
+	# page query, and MentorProfile.year adds a distinct-values query.
+	ADMIN_BUDGETS = {
+		'mentorprofile': 9,
+		'mentorrequest': 8,
+		'chatmessage': 8,
+	}
+
+	def test_admin_changelists(self):
+		self.login_superuser()
+		for model, budget in self.ADMIN_BUDGETS.items():
+			with self.subTest(model=model):
+				self.assertQueryBudget(reverse(f'admin:guidance_{model}_changelist'), budget, self.grow)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', TASKS_INLINE=False)
+class IssueCredentialsTests(TestCase):
+
+	def setUp(self):
+		for name, domain in (('asha', 'nitp.ac.in'), ('ravi', 'nitp.ac.in'), ('outsider', 'gmail.com')):
+			MentorProfile.objects.create(
+				user=User.objects.create_user(name, f'{name}@{domain}', 'old-password'), branch='CSE', year=3,
+			)
+
+	def issue(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			return issue_credentials(MentorProfile.objects.select_related('user').order_by('pk'))
+
+	def test_each_mentor_is_mailed_a_password_that_works(self):
+		sent, failures = self.issue()
+
+		self.assertEqual(sent, ['asha@nitp.ac.in', 'ravi@nitp.ac.in'])
+		self.assertEqual([email for email, _ in failures], ['outsider@gmail.com'])
+		self.assertEqual([message.to for message in mail.outbox], [[email] for email in sent])
+		for message in mail.outbox:
+			user = User.objects.get(email=message.to[0])
+			password = re.search(r'^Password: (\S+)$', message.body, re.MULTILINE).group(1)
+			self.assertTrue(user.check_password(password))
+			self.assertFalse(user.check_password('old-password'))
+			self.assertTrue(user.mentorprofile.is_approved)
+
+	def test_outsider_keeps_their_password(self):
+		self.issue()
+		outsider = User.objects.get(username='outsider')
+		self.assertTrue(outsider.check_password('old-password'))
+		self.assertFalse(outsider.mentorprofile.is_approved)
+
+	def test_task_taken_over_skips_mentors_already_mailed(self):
+		# An earlier attempt mailed Asha, saved her password and then went silent.
+		queued = send_credentials.delay(list(MentorProfile.objects.values_list('pk', flat=True)))
+		Task.objects.filter(pk=queued.pk).update(
+			status=Task.STATUS_RUNNING, locked_by='dead-worker', attempts=1, result={'sent': ['asha@nitp.ac.in'], 'failed': []},
+			locked_at=queued.run_at - taskqueue.LOCK_TIMEOUT * 2,
+		)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			taskqueue.run_batch('worker')
+
+		self.assertEqual([message.to for message in mail.outbox], [['ravi@nitp.ac.in']])
+		queued.refresh_from_db()
+		self.assertEqual(queued.status, Task.STATUS_DONE)
+		self.assertEqual(queued.result['sent'], ['asha@nitp.ac.in', 'ravi@nitp.ac.in'])
+		self.assertTrue(User.objects.get(username='asha').check_password('old-password'))
+
+
+class ChatBrokerTests(SimpleTestCase):
+
+	def test_a_broker_must_implement_publish_and_subscribe(self):
+		class PublishOnly(ChatBroker):
+			def publish(self, channel, payload):
+				pass
+
+		with self.assertRaises(TypeError):
+			PublishOnly()
+
+	def test_published_payloads_reach_subscribers_of_the_channel(self):
+		broker = InProcessBroker()
+
+		async def listen():
+			async with broker.subscribe('chat:1') as subscription, broker.subscribe('chat:2') as other:
+				self.assertEqual(broker.publish('chat:1', {'id': 1}), 1)
+				return await subscription.get(1), await other.get(0.05)
+
+		self.assertEqual(asyncio.run(listen()), ({'id': 1}, None))
+		self.assertEqual(broker.subscriber_count('chat:1'), 0)
+
+
+class MatcherReplayTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		self.mentor = MentorProfile.objects.create(
+			user=User.objects.create_user('asha', 'asha@nitp.ac.in', 'pw'), branch='CSE', year=4,
+			bio='Compilers and parsing', is_approved=True,
+		)
+		# Another process's matcher.
+		self.other = MentorMatcher()
+		self.other.build()
+
+	def test_other_processes_replay_edits_instead_of_rebuilding(self):
+		self.mentor.bio = 'Robotics'
+		with self.captureOnCommitCallbacks(execute=True):
+			self.mentor.save()
+		with mock.patch.object(self.other, 'build', side_effect=AssertionError('rebuilt')):
+			self.assertEqual([pk for pk, _, _ in self.other.match('robotics')], [self.mentor.pk])
+			self.assertEqual(self.other.match('compilers'), [])
+
+	def test_invalidate_makes_other_processes_rebuild(self):
+		matcher.invalidate()
+		with mock.patch.object(self.other, 'build', wraps=self.other.build) as build:
+			self.other.match('compilers')
+		build.assert_called_once()
+
+	def test_only_email_changes_reindex_a_mentors_account(self):
+		user = User.objects.get(pk=self.mentor.user_id)
+		with mock.patch.object(matcher, 'update_mentor') as update_mentor:
+			with self.captureOnCommitCallbacks(execute=True):
+				user.first_name = 'Asha'
+				user.save()
+				user.save(update_fields=['last_login'])
+			update_mentor.assert_not_called()
+			with self.captureOnCommitCallbacks(execute=True):
+				user.email = 'asha.k@nitp.ac.in'
+				user.save()
+			update_mentor.assert_called_once_with(user_id=user.pk)
+
+
+class ChatPollTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		self.student = User.objects.create_user('student', 'student@nitp.ac.in', 'pw')
+		self.mentor = MentorProfile.objects.create(
+			user=User.objects.create_user('mentor', 'mentor@nitp.ac.in', 'pw'), branch='CSE', year=4, is_approved=True,
+		)
+		self.chat = MentorRequest.objects.create(
+			student=self.student, mentor=self.mentor, message='Hi', student_whatsapp='8888888888',
+			status=MentorRequest.STATUS_APPROVED,
+		)
+		self.first = ChatMessage.objects.create(request=self.chat, sender=self.student, message='Hello')
+		self.url = reverse('guidance:chat_messages', args=[self.chat.pk])
+
+	def test_messages_after_the_cursor_then_304_when_nothing_is_new(self):
+		self.client.force_login(self.student)
+		response = self.client.get(self.url, {'after': 0})
+		self.assertEqual([message['message'] for message in response.json()['messages']], ['Hello'])
+		self.assertEqual(response.json()['after'], self.first.pk)
+
+		again = self.client.get(self.url, {'after': self.first.pk}, HTTP_IF_NONE_MATCH=response['ETag'])
+		self.assertEqual(again.status_code, 304)
+
+	def test_only_participants_may_poll(self):
+		self.client.force_login(User.objects.create_user('outsider', 'outsider@nitp.ac.in', 'pw'))
+		self.assertEqual(self.client.get(self.url).status_code, 403)
+
+	async def test_a_held_poll_times_out_empty(self):
+		await self.async_client.aforce_login(self.student)
+		started = time.monotonic()
+		response = await self.async_client.get(self.url, {'after': self.first.pk, 'wait': 1})
+		self.assertGreaterEqual(time.monotonic() - started, 1)
+		self.assertEqual(response.json(), {'messages': [], 'after': self.first.pk})
+
+	async def test_a_held_poll_answers_as_soon_as_a_message_is_published(self):
+		# Called without middleware, whose sync layers would run the view on another thread.
+		request = AsyncRequestFactory().get(self.url, {'after': self.first.pk, 'wait': 10})
+		request.user = self.student
+
+		async def user():
+			return self.student
+
+		request.auser = user
+
+		async def reply():
+			await asyncio.sleep(0.2)
+			message = await ChatMessage.objects.acreate(request=self.chat, sender=self.mentor.user, message='Hi there')
+			# What publish_chat_message does once the message commits.
+			get_broker().publish(chat_channel(self.chat.pk), {'id': message.pk})
+
+		started = time.monotonic()
+		response, _ = await asyncio.gather(views.chat_messages(request, self.chat.pk), reply())
+		self.assertLess(time.monotonic() - started, views.CHAT_POLL_RECHECK)
+		self.assertEqual([message['message'] for message in json.loads(response.content)['messages']], ['Hi there'])
+
+
+class ChatPaginationTests(TestCase):
+
+	def setUp(self):
+		student = User.objects.create_user('student', 'student@nitp.ac.in', 'pw')
+		mentor = MentorProfile.objects.create(
+			user=User.objects.create_user('mentor', 'mentor@nitp.ac.in', 'pw'), branch='CSE', year=4, is_approved=True,
+		)
+		self.chat = MentorRequest.objects.create(
+			student=student, mentor=mentor, message='Hi', student_whatsapp='8888888888',
+			status=MentorRequest.STATUS_APPROVED,
+		)
+		ChatMessage.objects.bulk_create([
+			ChatMessage(request=self.chat, sender=student, message=f'Message {n}') for n in range(7)
+		])
+		# Several messages share a timestamp, so the id has to break ties.
+		now = timezone.now()
+		for n, message in enumerate(self.chat.messages.order_by('pk')):
+			ChatMessage.objects.filter(pk=message.pk).update(sent_at=now + timedelta(seconds=n // 3))
+
+	def test_pages_walk_back_through_history_without_gaps_or_repeats(self):
+		pages, cursor = [], None
+		while True:
+			page, cursor = latest_messages(self.chat.messages.all(), decode_cursor(cursor), 3)
+			pages.append([message.message for message in page])
+			if cursor is None:
+				break
+		self.assertEqual(pages, [
+			['Message 4', 'Message 5', 'Message 6'],
+			['Message 1', 'Message 2', 'Message 3'],
+			['Message 0'],
+		])
+
+	def test_tampered_cursors_are_ignored(self):
+		cursor = encode_cursor(self.chat.messages.first())
+		self.assertIsNotNone(decode_cursor(cursor))
+		self.assertIsNone(decode_cursor(cursor[:-2] + 'xx'))
+		self.assertIsNone(decode_cursor('junk'))
+
+
+class MentorDashboardTests(TestCase):
+
+	def setUp(self):
+		self.mentor = MentorProfile.objects.create(
+			user=User.objects.create_user('mentor', 'mentor@nitp.ac.in', 'pw'), branch='CSE', year=4, is_approved=True,
+		)
+		self.start = timezone.now() - timedelta(hours=1)
+
+	def chat(self, name, *messages):
+		"""An approved chat with ``messages`` as (from_mentor, text) pairs, a minute apart."""
+		student = User.objects.create_user(name, f'{name}@nitp.ac.in', 'pw')
+		chat = MentorRequest.objects.create(
+			student=student, mentor=self.mentor, message='Hi', student_whatsapp='8888888888',
+			status=MentorRequest.STATUS_APPROVED, approved_at=self.start,
+		)
+		for minute, (from_mentor, text) in enumerate(messages, start=1):
+			message = ChatMessage.objects.create(
+				request=chat, sender=self.mentor.user if from_mentor else student, message=text,
+			)
+			ChatMessage.objects.filter(pk=message.pk).update(sent_at=self.start + timedelta(minutes=minute))
+		return chat
+
+	def test_each_chat_is_annotated_with_its_activity(self):
+		self.chat('quiet')
+		self.chat('asha', (False, 'First question'), (True, 'Answer'), (False, 'Follow-up'), (False, 'Another'))
+		self.chat('ravi', (False, 'x' * 200))
+		self.client.force_login(self.mentor.user)
+
+		chats = self.client.get(reverse('guidance:mentor_dashboard')).context['approved_requests']
+		self.assertEqual(
+			[
+				(chat.student.username, chat.last_message, chat.last_activity, chat.message_count, chat.unread_count)
+				for chat in chats
+			],
+			[
+				('asha', 'Another', self.start + timedelta(minutes=4), 4, 2),
+				('ravi', 'x' * views.SNIPPET_LENGTH, self.start + timedelta(minutes=1), 1, 1),
+				('quiet', None, self.start, 0, 0),
+			],
+		)
+
+
+class MentorCardCacheTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		reset_local_caches()
+		self.user = User.objects.create_user('asha', 'asha@nitp.ac.in', 'pw', first_name='Asha')
+		self.mentor = MentorProfile.objects.create(user=self.user, branch='CSE', year=4, bio='Compilers', is_approved=True)
+
+	def card(self):
+		return mentor_cards([self.user.pk])[self.user.pk]
+
+	def test_cards_are_rendered_once(self):
+		self.assertIn('Compilers', self.card())
+		MentorProfile.objects.update(bio='Updated without signals')
+		with self.assertNumQueries(0):
+			self.assertIn('Compilers', self.card())
+
+	def test_profile_and_user_edits_refresh_the_card(self):
+		self.card()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.mentor.bio = 'Robotics'
+			self.mentor.save()
+		self.assertIn('Robotics', self.card())
+		with self.captureOnCommitCallbacks(execute=True):
+			self.user.first_name = 'Ashwini'
+			self.user.save()
+		self.assertIn('Ashwini', self.card())
+
+	def test_deleted_mentors_leave_the_directory(self):
+		self.assertContains(self.client.get(reverse('guidance:guidance_home')), 'Compilers')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.mentor.delete()
+		self.assertEqual(mentor_cards([self.user.pk]), {})
+		self.assertNotContains(self.client.get(reverse('guidance:guidance_home')), 'Compilers')
+
+
+class MentorMatchTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		matcher.invalidate()
+
+	def mentor(self, name, bio, approved=True):
+		return MentorProfile.objects.create(
+			user=User.objects.create_user(name, f'{name}@nitp.ac.in', 'pw'), branch='CSE', year=4, bio=bio,
+			is_approved=approved,
+		)
+
+	def test_mentors_are_ranked_by_similarity_to_the_query(self):
+		focused = self.mentor('asha', 'Machine learning research and deep learning projects')
+		applied = self.mentor('ravi', 'Web development with Django')
+		MentorApplication.objects.create(
+			full_name='Ravi', email='RAVI@nitp.ac.in', branch='CSE', year=4, expertise='Machine learning pipelines',
+			mentor_whatsapp='9999999999', is_approved=True,
+		)
+		partial = self.mentor('meera', 'Learning guitar, chess and painting on weekends')
+		self.mentor('dev', 'Machine learning', approved=False)
+
+		ranked = [pk for pk, _, _ in matcher.match('I want help with machine learning')]
+		# Expertise from an approved application counts; unapproved mentors never match.
+		self.assertEqual(ranked, [focused.pk, applied.pk, partial.pk])
+
+	def test_symbols_in_terms_are_kept_and_stop_words_match_nothing(self):
+		cpp = self.mentor('asha', 'C++ and competitive programming')
+		self.mentor('ravi', 'C and embedded systems')
+		self.assertEqual([pk for pk, _, _ in matcher.match('c++')], [cpp.pk])
+		self.assertEqual(matcher.match('help me with the'), [])
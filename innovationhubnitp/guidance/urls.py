@@ -9,4 +9,6 @@ urlpatterns = [
     path('request/<int:mentor_id>/', views.request_guidance, name='request_guidance'),
     path('dashboard/', views.mentor_dashboard, name='mentor_dashboard'),
     path('chat/<int:request_id>/', views.chat_view, name='chat'),
+    path('chat/<int:request_id>/stream/', views.chat_stream, name='chat_stream'),
+    path('chat/<int:request_id>/messages/', views.chat_messages, name='chat_messages'),
 ]
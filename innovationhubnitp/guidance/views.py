@@ -1,31 +1,80 @@
 """Views for Senior Guidance portal."""
+import asyncio
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+	Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
+from .access import chat_participants
+from .directory import directory_cache, mentor_cards
+from .matching import matcher
 from .forms import MentorRequestForm, ChatMessageForm
 from .models import MentorProfile, MentorRequest, ChatMessage, validate_nitp_email
+from .pagination import decode_cursor, latest_messages, page_slice
+from .realtime import chat_channel, get_broker, message_payload, sse_event
+
+# Seconds between keep-alive comments on an idle chat stream.
+CHAT_STREAM_HEARTBEAT = 15
+# Long-poll limits: the longest a poll is held open, how often a held poll
+# re-checks the database (catching messages published by other processes),
+# and the most messages returned at once.
+CHAT_POLL_MAX_WAIT = 25
+CHAT_POLL_RECHECK = 2
+CHAT_POLL_LIMIT = 100
+CHAT_PAGE_SIZE = 50
+DASHBOARD_PAGE_SIZE = 20
+MENTORS_PER_PAGE = 12
+MENTOR_MATCH_LIMIT = 120
+SNIPPET_LENGTH = 120
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
 
 def guidance_view(request):
 	"""Public listing of approved mentors - no login required for viewing."""
-	mentors = MentorProfile.objects.filter(is_approved=True).select_related('user')
-	
-	# Annotate mentors with approved request IDs for authenticated users
-	if request.user.is_authenticated:
-		approved_req_map = {
-			req.mentor_id: req.id for req in MentorRequest.objects.filter(
-				student=request.user,
-				status=MentorRequest.STATUS_APPROVED
-			)
-		}
-		for mentor in mentors:
-			mentor.student_request_id = approved_req_map.get(mentor.id)
-	
+	query = request.GET.get('q', '').strip()
+	if query:
+		# Ranked by how well bio and expertise match what the student typed.
+		ranked = [(pk, user_id) for pk, user_id, _ in matcher.match(query, limit=MENTOR_MATCH_LIMIT)]
+		rows, page, has_next = page_slice(ranked, request.GET.get('page'), MENTORS_PER_PAGE)
+	else:
+		page = max(_as_int(request.GET.get('page'), 1), 1)
+		rows, page, has_next = directory_cache.get_or_set(('page', page), lambda: page_slice(
+			MentorProfile.objects.filter(is_approved=True).order_by('-created_at', '-pk').values_list('pk', 'user_id'),
+			page,
+			MENTORS_PER_PAGE,
+		))
+	cards = mentor_cards([user_id for _, user_id in rows])
+
+	# The per-user "Send Message" overlay only needs this page's mentors.
+	approved_req_map = {}
+	if request.user.is_authenticated and rows:
+		approved_req_map = dict(MentorRequest.objects.filter(
+			student=request.user,
+			status=MentorRequest.STATUS_APPROVED,
+			mentor_id__in=[pk for pk, _ in rows],
+		).values_list('mentor_id', 'id'))
+
+	mentors = [
+		{'id': pk, 'card': cards[user_id], 'student_request_id': approved_req_map.get(pk)}
+		for pk, user_id in rows
+		if user_id in cards
+	]
+
 	return render(request, 'guidance/guidance_home.html', {
 		'approved_mentors': mentors,
+		'search_query': query,
+		'page': page,
+		'has_next': has_next,
 	})
 
 
@@ -86,15 +135,59 @@ def mentor_dashboard(request):
 			messages.success(request, 'Request approved. Chat is now open.')
 			return redirect('guidance:mentor_dashboard')
 
-	pending_requests = profile.requests.filter(status=MentorRequest.STATUS_PENDING).select_related('student')
-	approved_requests = profile.requests.filter(status=MentorRequest.STATUS_APPROVED).select_related('student')
+	pending_requests, pending_page, pending_has_next = page_slice(
+		profile.requests.filter(status=MentorRequest.STATUS_PENDING).select_related('student').order_by('-created_at', '-pk'),
+		request.GET.get('pending_page'),
+		DASHBOARD_PAGE_SIZE,
+	)
+	approved_requests, chats_page, approved_has_next = page_slice(
+		_with_conversation_activity(
+			profile.requests.filter(status=MentorRequest.STATUS_APPROVED).select_related('student'),
+			profile.user_id,
+		).order_by('-last_activity', '-pk'),
+		request.GET.get('chats_page'),
+		DASHBOARD_PAGE_SIZE,
+	)
 
 	return render(request, 'guidance/mentor_dashboard.html', {
 		'pending_requests': pending_requests,
+		'pending_page': pending_page,
+		'pending_has_next': pending_has_next,
 		'approved_requests': approved_requests,
+		'chats_page': chats_page,
+		'approved_has_next': approved_has_next,
 	})
 
 
+def _count_of(queryset):
+	"""Wrap a per-request ChatMessage queryset as a correlated COUNT subquery."""
+	counted = queryset.order_by().values('request').annotate(total=Count('pk')).values('total')
+	return Coalesce(Subquery(counted), 0)
+
+
+def _with_conversation_activity(queryset, mentor_user_id):
+	"""
+	Annotate each request with its latest message snippet, last activity time,
+	message count and unread count, as subqueries of the same SELECT.
+
+	"Unread" means messages from the student since the mentor last replied.
+	"""
+	conversation = ChatMessage.objects.filter(request=OuterRef('pk'))
+	latest = conversation.order_by('-sent_at', '-pk')
+	last_reply = ChatMessage.objects.filter(
+		request=OuterRef('request'), sender_id=mentor_user_id,
+	).order_by('-sent_at').values('sent_at')[:1]
+	unread = conversation.exclude(sender_id=mentor_user_id).filter(
+		sent_at__gt=Coalesce(Subquery(last_reply), Value(_EPOCH)),
+	)
+	return queryset.annotate(
+		last_message=Subquery(latest.annotate(snippet=Substr('message', 1, SNIPPET_LENGTH)).values('snippet')[:1]),
+		last_activity=Coalesce(Subquery(latest.values('sent_at')[:1]), 'approved_at', 'created_at'),
+		message_count=_count_of(conversation),
+		unread_count=_count_of(unread),
+	)
+
+
 @login_required
 def chat_view(request, request_id):
 	"""Chat between student and mentor after approval."""
@@ -109,7 +202,6 @@ def chat_view(request, request_id):
 		messages.error(request, 'You do not have access to this chat.')
 		return redirect('guidance:guidance_home')
 
-	messages_qs = mentor_request.messages.select_related('sender')
 
 	if request.method == 'POST':
 		form = ChatMessageForm(request.POST)
@@ -118,12 +210,132 @@ def chat_view(request, request_id):
 			chat_message.sender = request.user
 			chat_message.request = mentor_request
 			chat_message.save()
+			if _wants_json(request):
+				return JsonResponse(message_payload(chat_message), status=201)
 			return redirect('guidance:chat', request_id=mentor_request.id)
+		if _wants_json(request):
+			return JsonResponse({'errors': form.errors}, status=400)
 	else:
 		form = ChatMessageForm()
 
+	chat_messages, older_cursor = latest_messages(
+		mentor_request.messages.select_related('sender'),
+		decode_cursor(request.GET.get('before')),
+		CHAT_PAGE_SIZE,
+	)
+
 	return render(request, 'guidance/chat.html', {
 		'mentor_request': mentor_request,
-		'messages': messages_qs,
+		'messages': chat_messages,
+		'older_cursor': older_cursor,
+		'is_latest_page': not request.GET.get('before'),
 		'form': form,
 	})
+
+
+def _wants_json(request):
+	return request.headers.get('Accept', '').startswith('application/json')
+
+
+def _as_int(value, default=0):
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return default
+
+
+def _messages_after(request_id, after):
+	return ChatMessage.objects.filter(request_id=request_id, id__gt=after).select_related('sender').only(
+		'id', 'request_id', 'sender_id', 'message', 'sent_at',
+		'sender__first_name', 'sender__last_name', 'sender__email',
+	).order_by('id')
+
+
+async def _check_chat_access(request, request_id):
+	"""Return an error response unless the user takes part in the approved chat."""
+	user = await request.auser()
+	participants = await sync_to_async(chat_participants)(request_id)
+	if participants is None:
+		raise Http404('No approved chat found.')
+	if user.id not in participants:
+		return HttpResponseForbidden('You do not have access to this chat.')
+	return None
+
+
+async def _chat_events(request_id, after):
+	"""Yield missed messages after ``after``, then live ones, as server-sent events."""
+	async with get_broker().subscribe(chat_channel(request_id)) as subscription:
+		yield 'retry: 3000\n\n'
+		# Subscribed first, so nothing committed from here on can fall between
+		# the backlog query and the live feed; the id check drops the overlap.
+		async for message in _messages_after(request_id, after):
+			after = message.id
+			yield sse_event(message_payload(message))
+		while not subscription.overflowed:
+			payload = await subscription.get(timeout=CHAT_STREAM_HEARTBEAT)
+			if payload is None:
+				yield ': keep-alive\n\n'
+			elif payload['id'] > after:
+				after = payload['id']
+				yield sse_event(payload)
+		# Fell behind: end the stream and let the client resume from Last-Event-ID.
+
+
+@login_required
+async def chat_stream(request, request_id):
+	"""Server-sent event feed of new messages in an approved chat."""
+	if not isinstance(request, ASGIRequest):
+		# A held-open stream would pin a WSGI worker; 204 tells EventSource not to retry.
+		return HttpResponse(status=204)
+
+	denied = await _check_chat_access(request, request_id)
+	if denied:
+		return denied
+
+	after = _as_int(request.headers.get('Last-Event-ID') or request.GET.get('after'))
+
+	response = StreamingHttpResponse(_chat_events(request_id, after), content_type='text/event-stream')
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'
+	return response
+
+
+@login_required
+async def chat_messages(request, request_id):
+	"""
+	JSON list of messages with id greater than ``?after=``, for clients without streaming.
+
+	With ``?wait=<seconds>`` the request is held until a message arrives or the
+	wait runs out (ASGI only; under WSGI it answers at once). An empty answer is
+	a 304 when the client sent the previous ETag back.
+	"""
+	denied = await _check_chat_access(request, request_id)
+	if denied:
+		return denied
+
+	after = max(_as_int(request.GET.get('after')), 0)
+	wait = 0
+	if isinstance(request, ASGIRequest):
+		wait = min(max(_as_int(request.GET.get('wait')), 0), CHAT_POLL_MAX_WAIT)
+
+	loop = asyncio.get_running_loop()
+	deadline = loop.time() + wait
+	async with get_broker().subscribe(chat_channel(request_id)) as subscription:
+		while True:
+			found = [message_payload(message) async for message in _messages_after(request_id, after)[:CHAT_POLL_LIMIT]]
+			remaining = deadline - loop.time()
+			if found or remaining <= 0:
+				break
+			# Woken early by a local publish; otherwise re-check the database.
+			await subscription.get(timeout=min(remaining, CHAT_POLL_RECHECK))
+
+	if found:
+		after = found[-1]['id']
+	etag = f'"chat-{request_id}-{after}"'
+	if not found and request.headers.get('If-None-Match') == etag:
+		response = HttpResponseNotModified()
+	else:
+		response = JsonResponse({'messages': found, 'after': after})
+	response['ETag'] = etag
+	response['Cache-Control'] = 'no-cache'
+	return response
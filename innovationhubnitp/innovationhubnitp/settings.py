@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.timing.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,6 +91,69 @@ DATABASES = {
 }
 
 
+# Cache
+# core.caching layers an in-process LRU over this cache. Version stamps and
+# invalidations only reach every worker when this cache is shared, so point
+# CACHE_BACKEND at Redis (django.core.cache.backends.redis.RedisCache, needs
+# redis-py) or the database cache (run createcachetable) in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='innovationhub'),
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'ih',
+    },
+}
+
+
+# Authentication
+# Students and mentors sign in by email; the admin keeps username logins.
+
+AUTHENTICATION_BACKENDS = [
+    'core.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Login and public form throttling (see core.throttling). Counters live in each
+# worker's memory; point THROTTLE_STORE at core.throttling.CacheStore to share
+# them through the cache named by THROTTLE_CACHE.
+THROTTLE_STORE = 'core.throttling.MemoryStore'
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted.
+THROTTLE_PROXY_COUNT = config('THROTTLE_PROXY_COUNT', default=0, cast=int)
+
+
+# Share of requests timed by core.timing.RequestTimingMiddleware (0 turns it
+# off, 1 times every request). Sampled responses carry a Server-Timing header
+# and log one JSON line to the core.timing logger.
+REQUEST_TIMING_SAMPLE_RATE = config('REQUEST_TIMING_SAMPLE_RATE', default=0.0, cast=float)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Sessions are read from the cache and written through to the database
+# (core.sessions). The default cache is per process, so cached copies are
+# capped at a minute for a logout in one worker to reach the others; set
+# SESSION_CACHE_TTL = None once CACHES points at a shared cache.
+# Run `manage.py purge_sessions` periodically to delete expired rows.
+SESSION_ENGINE = 'core.sessions'
+SESSION_CACHE_TTL = 60
+
+# Background tasks (see core.taskqueue) are run by `manage.py run_worker`.
+# TASKS_INLINE runs them in the request instead, so development needs no
+# worker; it is on whenever DEBUG is unless set explicitly.
+TASKS_INLINE = config('TASKS_INLINE', default=DEBUG, cast=bool)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
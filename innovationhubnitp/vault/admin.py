@@ -32,9 +32,9 @@ class SubjectAdmin(admin.ModelAdmin):
 class ResourceAdmin(admin.ModelAdmin):
     """Admin interface for Resources."""
     list_display = ['title', 'subject', 'resource_type', 'exam_type', 'is_verified', 'is_active', 'uploaded_at']
-    list_filter = ['resource_type', 'exam_type', 'is_verified', 'is_active', 'subject__branch', 'subject__semester']
+    list_filter = ['resource_type', 'exam_type', 'is_verified', 'is_active', 'link_status', 'subject__branch', 'subject__semester']
     search_fields = ['title', 'subject__name', 'uploaded_by']
-    readonly_fields = ['uploaded_at', 'updated_at']
+    readonly_fields = ['uploaded_at', 'updated_at', 'link_status', 'link_status_code', 'link_checked_at']
     ordering = ['-uploaded_at']
     fieldsets = (
         ('Resource Info', {
@@ -43,6 +43,10 @@ class ResourceAdmin(admin.ModelAdmin):
         ('Link & Attribution', {
             'fields': ('file_url', 'uploaded_by')
         }),
+        ('Link Health', {
+            'fields': ('link_status', 'link_status_code', 'link_checked_at'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('uploaded_at', 'updated_at', 'is_verified', 'is_active'),
             'classes': ('collapse',)
@@ -0,0 +1,78 @@
+"""Streaming export of the vault catalog as CSV or JSON Lines."""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Resource
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, ORM lookup) pairs, Resource joined to Subject and Branch.
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('resource_type', 'resource_type'),
+    ('exam_type', 'exam_type'),
+    ('file_url', 'file_url'),
+    ('uploaded_by', 'uploaded_by'),
+    ('uploaded_at', 'uploaded_at'),
+    ('updated_at', 'updated_at'),
+    ('is_verified', 'is_verified'),
+    ('is_active', 'is_active'),
+    ('subject_id', 'subject_id'),
+    ('subject_name', 'subject__name'),
+    ('subject_code', 'subject__code'),
+    ('semester', 'subject__semester'),
+    ('branch_id', 'subject__branch_id'),
+    ('branch_code', 'subject__branch__code'),
+    ('branch_name', 'subject__branch__name'),
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def export_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one tuple per resource in EXPORT_COLUMNS order.
+
+    ``iterator()`` uses a server-side cursor on Postgres and fetches
+    ``chunk_size`` rows at a time elsewhere, so memory stays flat.
+    """
+    if queryset is None:
+        queryset = Resource.objects.all()
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(
+            [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+        )
+
+
+def jsonl_lines(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def export_lines(fmt, rows):
+    """Return a line generator for ``fmt`` ('csv' or 'jsonl')."""
+    if fmt == 'jsonl':
+        return jsonl_lines(rows)
+    return csv_lines(rows)
@@ -0,0 +1,89 @@
+"""Cached facet counts for the vault filter dropdowns."""
+from collections import Counter
+
+from django.db.models import Count
+
+from core.caching import TieredCache
+
+from .models import Resource
+
+FACETS_CACHE_TTL = 60 * 60 * 24
+
+# Facet counts and listing pages of the catalog; bumped whenever a branch,
+# subject or resource changes.
+catalog_cache = TieredCache('vault.catalog', ttl=FACETS_CACHE_TTL)
+
+
+def _load_matrix():
+    """Count active resources per (branch, semester, resource_type, exam_type) in one query."""
+    rows = (
+        Resource.objects.filter(is_active=True)
+        .values_list('subject__branch_id', 'subject__semester', 'resource_type', 'exam_type')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    return [tuple(row) for row in rows]
+
+
+def get_facet_matrix():
+    """Return the cached facet matrix as a list of (branch_id, semester, type, exam_type, count)."""
+    return catalog_cache.get_or_set('facets', _load_matrix)
+
+
+def invalidate_facets():
+    """Drop the facet counts and every cached catalog page."""
+    catalog_cache.bump()
+
+
+class FacetCounts:
+    """
+    Facet counts for one set of filter selections.
+
+    Each dimension is counted with the *other* selections applied, so every
+    dropdown shows how many resources picking that option would return.
+    """
+
+    def __init__(self, branch_id=None, semester=None, resource_type=None, matrix=None):
+        self.branch_id = branch_id
+        self.semester = semester
+        self.resource_type = resource_type
+        self.branches = Counter()
+        self.semesters = Counter()
+        self.resource_types = Counter()
+        self.exam_types = Counter()
+        self.total = 0
+        for branch, sem, rtype, exam, count in get_facet_matrix() if matrix is None else matrix:
+            branch_ok = branch_id is None or branch == branch_id
+            semester_ok = semester is None or sem == semester
+            type_ok = not resource_type or rtype == resource_type
+            if semester_ok and type_ok:
+                self.branches[branch] += count
+            if branch_ok and type_ok:
+                self.semesters[sem] += count
+            if branch_ok and semester_ok:
+                self.resource_types[rtype] += count
+            if branch_ok and semester_ok and type_ok:
+                self.exam_types[exam] += count
+                self.total += count
+
+    def branch_options(self, branches):
+        """Return ``[(branch, count)]``, skipping empty branches unless selected."""
+        return [
+            (branch, self.branches[branch.id])
+            for branch in branches
+            if self.branches[branch.id] or branch.id == self.branch_id
+        ]
+
+    def semester_options(self, semesters):
+        return [
+            (sem, self.semesters[sem])
+            for sem in semesters
+            if self.semesters[sem] or sem == self.semester
+        ]
+
+    def resource_type_options(self, choices):
+        return [
+            (value, label, self.resource_types[value])
+            for value, label in choices
+            if self.resource_types[value] or value == self.resource_type
+        ]
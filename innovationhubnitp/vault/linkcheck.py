@@ -0,0 +1,221 @@
+"""Asynchronous reachability checks for resource links."""
+import asyncio
+import ssl
+from collections import defaultdict, deque
+from urllib.parse import urljoin, urlsplit
+
+from django.utils.encoding import iri_to_uri
+
+USER_AGENT = 'InnovationHub-LinkChecker/1.0'
+MAX_REDIRECTS = 5
+# Ranged GET responses with a body larger than this are not drained, and their
+# connection is closed instead of returned to the pool.
+MAX_DRAIN_BYTES = 64 * 1024
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+# Some hosts reject HEAD but answer GET; only these HEAD answers are trusted as final.
+HEAD_FINAL_CODES = {404, 410}
+
+
+class LinkError(Exception):
+    """A link could not be fetched (DNS, connection, TLS, timeout or bad response)."""
+
+
+def classify(status_code):
+    """Map an HTTP status (``None`` when unreachable) to a ``Resource.link_status``."""
+    if status_code is None or status_code == 429 or status_code >= 500:
+        return 'ERROR'
+    if status_code >= 400:
+        return 'BROKEN'
+    return 'OK'
+
+
+def interleave_by_host(links):
+    """Order ``[(pk, url)]`` round-robin across hosts so one busy host does not stall the rest."""
+    queues = defaultdict(deque)
+    for pk, url in links:
+        queues[urlsplit(url).netloc.lower()].append((pk, url))
+    ordered = []
+    pending = deque(queues.values())
+    while pending:
+        queue = pending.popleft()
+        ordered.append(queue.popleft())
+        if queue:
+            pending.append(queue)
+    return ordered
+
+
+class _Host:
+    """Connection pool and request pacing for one scheme/host/port."""
+
+    def __init__(self, connections, rate):
+        self.slots = asyncio.Semaphore(connections)
+        self.idle = []
+        self.interval = 1 / rate if rate else 0
+        self.next_start = 0.0
+
+    async def wait_turn(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def close(self):
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+
+
+class LinkChecker:
+    """
+    Check many URLs concurrently with HEAD, falling back to a one-byte ranged GET.
+
+    ``concurrency`` bounds the links in flight overall; each host gets at most
+    ``per_host`` keep-alive connections and ``rate`` request starts per second.
+    """
+
+    def __init__(self, concurrency=100, per_host=8, rate=20.0, timeout=10.0):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.hosts = {}
+        self.ssl_context = ssl.create_default_context()
+
+    async def run(self, links, on_result):
+        """Check ``[(pk, url)]`` and ``await on_result(pk, status_code)`` as each finishes."""
+        queue = deque(interleave_by_host(links))
+
+        async def worker():
+            while queue:
+                pk, url = queue.popleft()
+                try:
+                    status_code = await self.check(url)
+                except LinkError:
+                    status_code = None
+                await on_result(pk, status_code)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(queue)) or 1)))
+        finally:
+            for host in self.hosts.values():
+                host.close()
+            self.hosts.clear()
+
+    async def check(self, url):
+        """Return the final HTTP status for ``url`` after redirects."""
+        status_code, final_url = await self._follow('HEAD', url)
+        if status_code >= 400 and status_code not in HEAD_FINAL_CODES:
+            status_code, _ = await self._follow('GET', final_url)
+        return status_code
+
+    async def _follow(self, method, url):
+        for _ in range(MAX_REDIRECTS + 1):
+            status_code, location = await self._request(method, url)
+            if status_code not in REDIRECT_CODES or not location:
+                return status_code, url
+            url = urljoin(url, location)
+        raise LinkError('too many redirects')
+
+    async def _request(self, method, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise LinkError(f'unsupported URL {url!r}')
+        try:
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except ValueError:
+            raise LinkError(f'invalid port in {url!r}')
+        key = (parts.scheme, parts.hostname, port)
+        host = self.hosts.get(key)
+        if host is None:
+            host = self.hosts[key] = _Host(self.per_host, self.rate)
+
+        # Links may be IRIs: percent-encode the path and query, and send
+        # internationalized host names in their ASCII (punycode) form.
+        target = iri_to_uri(parts.path or '/')
+        if parts.query:
+            target += '?' + iri_to_uri(parts.query)
+        try:
+            host_header = parts.netloc.rpartition('@')[2].encode('idna').decode('ascii')
+        except UnicodeError:
+            raise LinkError(f'invalid host name in {url!r}')
+        lines = [
+            f'{method} {target} HTTP/1.1',
+            f'Host: {host_header}',
+            f'User-Agent: {USER_AGENT}',
+            'Accept: */*',
+        ]
+        if method == 'GET':
+            lines.append('Range: bytes=0-0')
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('ascii')
+
+        async with host.slots:
+            await host.wait_turn()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    return await self._exchange(host, key, method, request)
+            except (OSError, TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                raise LinkError(str(exc) or exc.__class__.__name__) from exc
+
+    async def _exchange(self, host, key, method, request):
+        # A pooled connection may have been closed by the server while idle;
+        # retry once on a fresh one if nothing was read from it.
+        while host.idle:
+            reader, writer = host.idle.pop()
+            if writer.is_closing():
+                continue
+            try:
+                return await self._send(host, reader, writer, method, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                break
+            except BaseException:
+                writer.close()
+                raise
+
+        scheme, hostname, port = key
+        reader, writer = await asyncio.open_connection(
+            hostname, port,
+            ssl=self.ssl_context if scheme == 'https' else None,
+            server_hostname=hostname if scheme == 'https' else None,
+        )
+        try:
+            return await self._send(host, reader, writer, method, request)
+        except BaseException:
+            writer.close()
+            raise
+
+    async def _send(self, host, reader, writer, method, request):
+        writer.write(request)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        try:
+            status_code = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise LinkError(f'malformed status line {status_line[:80]!r}')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        reusable = headers.get('connection', '').lower() != 'close'
+        if method != 'HEAD' and status_code not in (204, 304):
+            length = headers.get('content-length')
+            if length and length.isdigit() and int(length) <= MAX_DRAIN_BYTES:
+                await reader.readexactly(int(length))
+            else:
+                reusable = False
+
+        if reusable:
+            host.idle.append((reader, writer))
+        else:
+            writer.close()
+        return status_code, headers.get('location')
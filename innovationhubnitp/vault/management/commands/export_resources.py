@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from vault.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_lines, export_rows
+from vault.models import Resource
+
+
+class Command(BaseCommand):
+    help = 'Stream the vault resource catalog as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--active-only', action='store_true', help='Skip inactive resources')
+
+    def handle(self, *args, **options):
+        queryset = Resource.objects.all()
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+        lines = export_lines(options['format'], export_rows(queryset, options['chunk_size']))
+
+        if options['output']:
+            written = 0
+            with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+                for line in lines:
+                    handle.write(line)
+                    written += 1
+            header_lines = 1 if options['format'] == 'csv' else 0
+            self.stderr.write(self.style.SUCCESS(
+                f'Exported {written - header_lines} resources to {options["output"]}'
+            ))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,196 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from vault.facets import invalidate_facets
+from vault.models import Branch, Subject, Resource, url_key_for
+from vault.search import index as search_index
+
+RESOURCE_TYPES = {value for value, _ in Resource.RESOURCE_TYPE_CHOICES}
+EXAM_TYPES = {value for value, _ in Resource.EXAM_TYPE_CHOICES}
+# Moderation state (verified, active) and the uploader are only set when a
+# resource is first imported; re-imports leave them as moderators left them.
+UPDATE_FIELDS = ['subject', 'title', 'description', 'resource_type', 'exam_type', 'file_url', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = (
+        'Import vault resources from CSV or JSON Lines, upserting on the normalized file_url. '
+        'Columns: title, file_url, resource_type, branch_code, subject_code, subject_name, '
+        'semester and optionally description, exam_type, uploaded_by, is_verified.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--verified', action='store_true', help='Mark imported resources as verified')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = max(options['batch_size'], 1)
+        self.verified = options['verified']
+
+        # In-memory lookups: one query each, then new subjects are added as they appear.
+        self.branches = {code.upper(): pk for pk, code in Branch.objects.values_list('pk', 'code')}
+        self.subjects_by_code = {}
+        self.subjects_by_name = {}
+        self.uncoded_subjects = {}
+        for pk, branch_id, code, name, semester in Subject.objects.values_list(
+            'pk', 'branch_id', 'code', 'name', 'semester'
+        ):
+            if code:
+                self.subjects_by_code[(branch_id, code.upper(), semester)] = pk
+            else:
+                self.uncoded_subjects[(branch_id, semester)] = name
+            self.subjects_by_name[(branch_id, name.lower(), semester)] = pk
+
+        self.stats = {'read': 0, 'created': 0, 'updated': 0, 'duplicates': 0, 'skipped': 0, 'subjects': 0}
+        seen_keys = set()
+        batch = []
+        started = time.monotonic()
+
+        handle = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            for line_no, row in self._read_rows(handle, fmt):
+                self.stats['read'] += 1
+                resource = self._build_resource(line_no, row)
+                if resource is None:
+                    self.stats['skipped'] += 1
+                    continue
+                if resource.url_key in seen_keys:
+                    self.stats['duplicates'] += 1
+                    continue
+                seen_keys.add(resource.url_key)
+                batch.append(resource)
+                if len(batch) >= batch_size:
+                    self._flush(batch)
+                    batch = []
+            if batch:
+                self._flush(batch)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        if self.stats['created'] or self.stats['updated']:
+            # bulk_create skips model signals, so refresh the derived caches here.
+            invalidate_facets()
+            search_index.invalidate()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        written = self.stats['created'] + self.stats['updated']
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {self.stats['read']} rows: {self.stats['created']} created, "
+            f"{self.stats['updated']} updated, {self.stats['duplicates']} duplicate links, "
+            f"{self.stats['skipped']} skipped, {self.stats['subjects']} new subjects "
+            f"in {elapsed:.2f}s ({written / elapsed:.0f} rows/s)"
+        ))
+
+    def _read_rows(self, handle, fmt):
+        if fmt == 'jsonl':
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        raise CommandError(f'Line {line_no}: invalid JSON ({exc})')
+        else:
+            # Line 1 is the header row.
+            for line_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_no, row
+
+    def _warn(self, line_no, message):
+        self.stderr.write(f'Line {line_no}: {message}, skipped')
+
+    def _build_resource(self, line_no, row):
+        def value(name):
+            return str(row.get(name) or '').strip()
+
+        title, file_url = value('title'), value('file_url')
+        if not title or not file_url:
+            self._warn(line_no, 'missing title or file_url')
+            return None
+
+        resource_type = value('resource_type').upper()
+        if resource_type not in RESOURCE_TYPES:
+            self._warn(line_no, f'unknown resource_type {resource_type!r}')
+            return None
+        exam_type = value('exam_type').upper() or 'NA'
+        if exam_type not in EXAM_TYPES:
+            exam_type = 'NA'
+
+        subject_id = self._subject_id(line_no, row, value)
+        if subject_id is None:
+            return None
+
+        is_verified = self.verified or value('is_verified').lower() in ('1', 'true', 'yes')
+        return Resource(
+            subject_id=subject_id,
+            title=title[:300],
+            description=value('description'),
+            resource_type=resource_type,
+            exam_type=exam_type,
+            file_url=file_url,
+            url_key=url_key_for(file_url),
+            uploaded_by=value('uploaded_by')[:100],
+            is_verified=is_verified,
+            is_active=True,
+        )
+
+    def _subject_id(self, line_no, row, value):
+        branch_id = self.branches.get(value('branch_code').upper())
+        if branch_id is None:
+            self._warn(line_no, f"unknown branch {value('branch_code')!r}")
+            return None
+        try:
+            semester = int(value('semester'))
+        except ValueError:
+            semester = 0
+        if not 1 <= semester <= 8:
+            self._warn(line_no, f"invalid semester {value('semester')!r}")
+            return None
+
+        code, name = value('subject_code').upper(), value('subject_name')
+        subject_id = None
+        if code:
+            subject_id = self.subjects_by_code.get((branch_id, code, semester))
+        if subject_id is None and name:
+            subject_id = self.subjects_by_name.get((branch_id, name.lower(), semester))
+        if subject_id is not None:
+            return subject_id
+        if not name:
+            self._warn(line_no, f'unknown subject {code!r} and no subject_name to create it')
+            return None
+
+        if not code:
+            # Codes are unique per branch and semester, blank ones included, so
+            # only one subject there can go without a code.
+            uncoded = self.uncoded_subjects.get((branch_id, semester))
+            if uncoded is not None:
+                self._warn(line_no, f'subject {name!r} has no subject_code and {uncoded!r} already has none')
+                return None
+            self.uncoded_subjects[(branch_id, semester)] = name
+        subject = Subject.objects.create(branch_id=branch_id, code=code, semester=semester, name=name[:200])
+        self.stats['subjects'] += 1
+        if code:
+            self.subjects_by_code[(branch_id, code, semester)] = subject.pk
+        self.subjects_by_name[(branch_id, name.lower(), semester)] = subject.pk
+        return subject.pk
+
+    def _flush(self, batch):
+        keys = [resource.url_key for resource in batch]
+        with transaction.atomic():
+            existing = Resource.objects.filter(url_key__in=keys).count()
+            Resource.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['url_key'],
+                update_fields=UPDATE_FIELDS,
+            )
+        self.stats['updated'] += existing
+        self.stats['created'] += len(batch) - existing
@@ -0,0 +1,178 @@
+from django.db import migrations
+
+# The SQL is spelled out here rather than imported from vault.search_backends,
+# so this migration keeps doing what it did when it was written.
+
+POSTGRES_INSTALL_SQL = [
+    'ALTER TABLE vault_resource ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    'CREATE INDEX IF NOT EXISTS vault_resource_search_idx ON vault_resource USING gin (search_vector)',
+    """
+    CREATE OR REPLACE FUNCTION vault_resource_search_vector(res_title text, res_description text, res_subject_id bigint)
+    RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('english', coalesce(res_title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(s.name, '')) || to_tsvector('simple', coalesce(s.code, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(b.code, '')), 'C')
+            || setweight(to_tsvector('english', coalesce(res_description, '')), 'D')
+        FROM vault_subject s JOIN vault_branch b ON b.id = s.branch_id
+        WHERE s.id = res_subject_id
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION vault_resource_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := vault_resource_search_vector(NEW.title, NEW.description, NEW.subject_id);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION vault_subject_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        UPDATE vault_resource
+        SET search_vector = vault_resource_search_vector(title, description, subject_id)
+        WHERE subject_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION vault_branch_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        UPDATE vault_resource r
+        SET search_vector = vault_resource_search_vector(r.title, r.description, r.subject_id)
+        FROM vault_subject s
+        WHERE r.subject_id = s.id AND s.branch_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS vault_resource_search_update ON vault_resource',
+    """
+    CREATE TRIGGER vault_resource_search_update
+    BEFORE INSERT OR UPDATE OF title, description, subject_id ON vault_resource
+    FOR EACH ROW EXECUTE FUNCTION vault_resource_search_trigger()
+    """,
+    'DROP TRIGGER IF EXISTS vault_subject_search_update ON vault_subject',
+    """
+    CREATE TRIGGER vault_subject_search_update
+    AFTER UPDATE OF name, code, branch_id ON vault_subject
+    FOR EACH ROW EXECUTE FUNCTION vault_subject_search_trigger()
+    """,
+    'DROP TRIGGER IF EXISTS vault_branch_search_update ON vault_branch',
+    """
+    CREATE TRIGGER vault_branch_search_update
+    AFTER UPDATE OF code ON vault_branch
+    FOR EACH ROW EXECUTE FUNCTION vault_branch_search_trigger()
+    """,
+    """
+    UPDATE vault_resource
+    SET search_vector = vault_resource_search_vector(title, description, subject_id)
+    WHERE search_vector IS NULL
+    """,
+]
+
+POSTGRES_UNINSTALL_SQL = [
+    'DROP TRIGGER IF EXISTS vault_branch_search_update ON vault_branch',
+    'DROP TRIGGER IF EXISTS vault_subject_search_update ON vault_subject',
+    'DROP TRIGGER IF EXISTS vault_resource_search_update ON vault_resource',
+    'DROP FUNCTION IF EXISTS vault_branch_search_trigger()',
+    'DROP FUNCTION IF EXISTS vault_subject_search_trigger()',
+    'DROP FUNCTION IF EXISTS vault_resource_search_trigger()',
+    'DROP FUNCTION IF EXISTS vault_resource_search_vector(text, text, bigint)',
+    'DROP INDEX IF EXISTS vault_resource_search_idx',
+    'ALTER TABLE vault_resource DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_NEW_ROW = """
+    SELECT NEW.id, NEW.title, s.name || ' ' || s.code, b.code, NEW.description
+    FROM vault_subject s JOIN vault_branch b ON b.id = s.branch_id
+    WHERE s.id = NEW.subject_id
+"""
+
+SQLITE_INSTALL_SQL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS vault_resource_fts '
+    "USING fts5(title, subject, branch, description, tokenize='porter unicode61')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vault_resource_fts_insert AFTER INSERT ON vault_resource BEGIN
+        INSERT INTO vault_resource_fts (rowid, title, subject, branch, description)
+        {SQLITE_NEW_ROW};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS vault_resource_fts_update
+    AFTER UPDATE OF title, description, subject_id ON vault_resource BEGIN
+        DELETE FROM vault_resource_fts WHERE rowid = OLD.id;
+        INSERT INTO vault_resource_fts (rowid, title, subject, branch, description)
+        {SQLITE_NEW_ROW};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vault_resource_fts_delete AFTER DELETE ON vault_resource BEGIN
+        DELETE FROM vault_resource_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vault_subject_fts_update
+    AFTER UPDATE OF name, code, branch_id ON vault_subject BEGIN
+        UPDATE vault_resource_fts
+        SET subject = NEW.name || ' ' || NEW.code,
+            branch = (SELECT code FROM vault_branch WHERE id = NEW.branch_id)
+        WHERE rowid IN (SELECT id FROM vault_resource WHERE subject_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vault_branch_fts_update AFTER UPDATE OF code ON vault_branch BEGIN
+        UPDATE vault_resource_fts
+        SET branch = NEW.code
+        WHERE rowid IN (
+            SELECT r.id FROM vault_resource r JOIN vault_subject s ON s.id = r.subject_id
+            WHERE s.branch_id = NEW.id
+        );
+    END
+    """,
+    'DELETE FROM vault_resource_fts',
+    """
+    INSERT INTO vault_resource_fts (rowid, title, subject, branch, description)
+    SELECT r.id, r.title, s.name || ' ' || s.code, b.code, r.description
+    FROM vault_resource r
+    JOIN vault_subject s ON s.id = r.subject_id
+    JOIN vault_branch b ON b.id = s.branch_id
+    """,
+]
+
+SQLITE_UNINSTALL_SQL = [
+    'DROP TRIGGER IF EXISTS vault_resource_fts_insert',
+    'DROP TRIGGER IF EXISTS vault_resource_fts_update',
+    'DROP TRIGGER IF EXISTS vault_resource_fts_delete',
+    'DROP TRIGGER IF EXISTS vault_subject_fts_update',
+    'DROP TRIGGER IF EXISTS vault_branch_fts_update',
+    'DROP TABLE IF EXISTS vault_resource_fts',
+]
+
+INSTALL_SQL = {'postgresql': POSTGRES_INSTALL_SQL, 'sqlite': SQLITE_INSTALL_SQL}
+UNINSTALL_SQL = {'postgresql': POSTGRES_UNINSTALL_SQL, 'sqlite': SQLITE_UNINSTALL_SQL}
+
+
+def _run(statements, schema_editor):
+    # Other databases use the in-process index and need nothing installed.
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql, params=None)
+
+
+def install_search(apps, schema_editor):
+    _run(INSTALL_SQL, schema_editor)
+
+
+def uninstall_search(apps, schema_editor):
+    _run(UNINSTALL_SQL, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vault', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
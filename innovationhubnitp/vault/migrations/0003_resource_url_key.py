@@ -0,0 +1,94 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:35
+
+import re
+from importlib import import_module
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.db import migrations, models
+
+# SQLite rebuilds vault_resource to add a unique column, and refuses while the
+# search triggers from 0002 on the other vault tables reference it. Drop them
+# around the rebuild, then reinstall them and resynchronize the FTS table.
+search_migration = import_module('vault.migrations.0002_resource_search')
+SQLITE_TRIGGERS = [
+    'vault_resource_fts_insert',
+    'vault_resource_fts_update',
+    'vault_resource_fts_delete',
+    'vault_subject_fts_update',
+    'vault_branch_fts_update',
+]
+
+
+def suspend_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}', params=None)
+
+
+def resume_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in search_migration.SQLITE_INSTALL_SQL:
+            schema_editor.execute(sql, params=None)
+
+
+# vault.models.normalize_file_url as of this migration, so later changes to
+# it don't change what the migration does.
+_DRIVE_ID_RE = re.compile(r'/(?:file/)?d/([\w-]+)')
+_TRACKING_PARAMS = {'usp', 'fbclid', 'gclid', 'ref'}
+
+
+def normalize_file_url(url):
+    parts = urlsplit((url or '').strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith('utm_')
+    ]
+    if host in ('drive.google.com', 'docs.google.com'):
+        match = _DRIVE_ID_RE.search(parts.path)
+        file_id = match.group(1) if match else dict(params).get('id')
+        if file_id:
+            return f'drive:{file_id}'
+    key = host + parts.path.rstrip('/')
+    if params:
+        key += '?' + urlencode(sorted(params))
+    return key
+
+
+def backfill_url_keys(apps, schema_editor):
+    """Key existing resources; later duplicates of a link keep a NULL key."""
+    Resource = apps.get_model('vault', 'Resource')
+    seen = set()
+    batch = []
+    for resource in Resource.objects.order_by('pk').only('pk', 'file_url').iterator(chunk_size=2000):
+        key = normalize_file_url(resource.file_url)[:200]
+        if key in seen:
+            continue
+        seen.add(key)
+        resource.url_key = key
+        batch.append(resource)
+        if len(batch) >= 1000:
+            Resource.objects.bulk_update(batch, ['url_key'])
+            batch = []
+    if batch:
+        Resource.objects.bulk_update(batch, ['url_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vault', '0002_resource_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(suspend_search_triggers, resume_search_triggers),
+        migrations.AddField(
+            model_name='resource',
+            name='url_key',
+            field=models.CharField(blank=True, editable=False, help_text='Normalized file_url used to de-duplicate resources', max_length=200, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_url_keys, migrations.RunPython.noop),
+        migrations.RunPython(resume_search_triggers, suspend_search_triggers),
+    ]
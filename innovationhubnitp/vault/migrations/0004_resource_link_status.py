@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vault', '0003_resource_url_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='link_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='link_status',
+            field=models.CharField(blank=True, choices=[('OK', 'Reachable'), ('BROKEN', 'Broken'), ('ERROR', 'Unreachable')], editable=False, help_text='Result of the last check_links run', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='link_status_code',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+import hashlib
+from importlib import import_module
+
+from django.db import migrations, models
+
+url_key_migration = import_module('vault.migrations.0003_resource_url_key')
+
+
+def hash_url_keys(apps, schema_editor):
+    """
+    Re-key every resource with a SHA-256 of its untruncated normalized link.
+
+    Links that only collided because 0003 cut keys to 200 characters get
+    keys of their own; true duplicates keep a NULL key, as before.
+    """
+    Resource = apps.get_model('vault', 'Resource')
+    Resource.objects.update(url_key=None)
+    seen = set()
+    batch = []
+    for resource in Resource.objects.order_by('pk').only('pk', 'file_url').iterator(chunk_size=2000):
+        normalized = url_key_migration.normalize_file_url(resource.file_url)
+        key = hashlib.sha256(normalized.encode()).hexdigest()
+        if key in seen:
+            continue
+        seen.add(key)
+        resource.url_key = key
+        batch.append(resource)
+        if len(batch) >= 1000:
+            Resource.objects.bulk_update(batch, ['url_key'])
+            batch = []
+    if batch:
+        Resource.objects.bulk_update(batch, ['url_key'])
+
+
+def unhash_url_keys(apps, schema_editor):
+    apps.get_model('vault', 'Resource').objects.update(url_key=None)
+    url_key_migration.backfill_url_keys(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vault', '0004_resource_link_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resource',
+            name='url_key',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the normalized file_url, used to de-duplicate resources', max_length=200, null=True, unique=True),
+        ),
+        migrations.RunPython(hash_url_keys, unhash_url_keys),
+    ]
@@ -1,5 +1,44 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.core.exceptions import ValidationError
 from django.db import models
 
+_DRIVE_ID_RE = re.compile(r'/(?:file/)?d/([\w-]+)')
+_TRACKING_PARAMS = {'usp', 'fbclid', 'gclid', 'ref'}
+
+
+def normalize_file_url(url):
+    """
+    Reduce a resource link to a canonical key so the same file is stored once.
+
+    Scheme, ``www.``, fragments, trailing slashes and tracking parameters are
+    ignored, and the various Google Drive/Docs link shapes collapse to the file id.
+    """
+    parts = urlsplit((url or '').strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith('utm_')
+    ]
+    if host in ('drive.google.com', 'docs.google.com'):
+        match = _DRIVE_ID_RE.search(parts.path)
+        file_id = match.group(1) if match else dict(params).get('id')
+        if file_id:
+            return f'drive:{file_id}'
+    key = host + parts.path.rstrip('/')
+    if params:
+        key += '?' + urlencode(sorted(params))
+    return key
+
+
+def url_key_for(url):
+    """Return the de-duplication key of a link: a SHA-256 of its normalized form, whatever its length."""
+    return hashlib.sha256(normalize_file_url(url).encode()).hexdigest()
+
 
 class Branch(models.Model):
     """Engineering branch/specialization."""
@@ -48,17 +87,33 @@ class Resource(models.Model):
         ('NA', 'N/A'),
     ]
 
+    LINK_STATUS_CHOICES = [
+        ('OK', 'Reachable'),
+        ('BROKEN', 'Broken'),
+        ('ERROR', 'Unreachable'),
+    ]
+
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='resources')
     title = models.CharField(max_length=300)  # e.g., "DSP PYQ 2023"
     description = models.TextField(blank=True)
     resource_type = models.CharField(max_length=10, choices=RESOURCE_TYPE_CHOICES)
     exam_type = models.CharField(max_length=10, choices=EXAM_TYPE_CHOICES, default='NA')
     file_url = models.URLField(help_text="Google Drive link or external URL")
+    url_key = models.CharField(
+        max_length=200, unique=True, null=True, blank=True, editable=False,
+        help_text="SHA-256 of the normalized file_url, used to de-duplicate resources",
+    )
     uploaded_by = models.CharField(max_length=100, blank=True, help_text="Name of contributor")
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_verified = models.BooleanField(default=False, help_text="Verified by admin")
     is_active = models.BooleanField(default=True)
+    link_status = models.CharField(
+        max_length=10, choices=LINK_STATUS_CHOICES, null=True, blank=True, editable=False,
+        help_text="Result of the last check_links run",
+    )
+    link_status_code = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    link_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-uploaded_at']
@@ -70,3 +125,40 @@ class Resource(models.Model):
 
     def __str__(self):
         return f"{self.title} ({self.get_resource_type_display()}) - {self.subject.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so only a changed link is re-keyed and checked for duplicates.
+        if 'file_url' in instance.__dict__:
+            instance._loaded_file_url = instance.file_url
+        return instance
+
+    def _file_url_changed(self):
+        """
+        True for a new resource or a changed link.
+
+        Legacy duplicates were left without a key by the url_key migration.
+        Re-keying them on an unrelated edit would collide with the resource
+        that kept the key, so the key is only touched when the link changes.
+        """
+        return self._state.adding or self.file_url != getattr(self, '_loaded_file_url', self.file_url)
+
+    def clean(self):
+        """Reject a link that is already in the vault under another resource."""
+        if not self._file_url_changed():
+            return
+        key = url_key_for(self.file_url)
+        if Resource.objects.filter(url_key=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'file_url': 'A resource with this link already exists.'})
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        rekey = self._file_url_changed() and (update_fields is None or 'file_url' in update_fields)
+        if rekey:
+            self.url_key = url_key_for(self.file_url)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'url_key'}
+        super().save(*args, **kwargs)
+        if rekey:
+            self._loaded_file_url = self.file_url
@@ -0,0 +1,43 @@
+"""Keyset pagination for the subject-grouped vault listing."""
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'vault.subject_cursor'
+
+
+def encode_cursor(subject):
+    """Build an opaque, tamper-proof cursor pointing just past ``subject``."""
+    return signing.dumps([subject.semester, subject.name, subject.pk], salt=CURSOR_SALT)
+
+
+def decode_cursor(value):
+    """Return ``(semester, name, pk)`` for a cursor, or None if missing/invalid."""
+    if not value:
+        return None
+    try:
+        semester, name, pk = signing.loads(value, salt=CURSOR_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    return semester, name, pk
+
+
+def paginate_subjects(queryset, cursor, per_page):
+    """
+    Return one page of subjects ordered by (semester, name, pk) plus the next cursor.
+
+    The page is fetched with a single ``LIMIT per_page + 1`` query seeking past the
+    cursor, so the cost does not grow with how deep into the catalog the page is.
+    """
+    if cursor is not None:
+        semester, name, pk = cursor
+        queryset = queryset.filter(
+            Q(semester__gt=semester)
+            | Q(semester=semester, name__gt=name)
+            | Q(semester=semester, name=name, pk__gt=pk)
+        )
+    subjects = list(queryset.order_by('semester', 'name', 'pk')[:per_page + 1])
+    next_cursor = None
+    if len(subjects) > per_page:
+        subjects = subjects[:per_page]
+        next_cursor = encode_cursor(subjects[-1])
+    return subjects, next_cursor
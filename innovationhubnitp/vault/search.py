@@ -0,0 +1,265 @@
+"""In-process inverted index for searching vault resources."""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from core.caching import ChangeLog
+
+from .models import Resource
+
+# Resource filters re-indexed in some process, or None for "rebuild everything".
+changes = ChangeLog('vault.search')
+
+# Relative weight of each field when a term occurs in it.
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'subject': 2.0,
+    'branch': 1.5,
+    'description': 1.0,
+}
+
+STOP_WORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'on', 'the', 'to'})
+
+# Minimum trigram similarity (same default as Postgres pg_trgm) for a fuzzy match,
+# and how many fuzzy vocabulary terms a single query term may expand to.
+FUZZY_THRESHOLD = 0.3
+FUZZY_EXPANSIONS = 5
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_DIGIT_LOOKALIKES = str.maketrans({'o': '0', 'i': '1', 'l': '1'})
+
+
+def _normalize(token):
+    """Map letters typed in place of digits ("2O23" -> "2023") inside numeric tokens."""
+    if any(ch.isdigit() for ch in token):
+        swapped = token.translate(_DIGIT_LOOKALIKES)
+        if swapped.isdigit():
+            return swapped
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized, lowercase search terms."""
+    return [
+        _normalize(token)
+        for token in _TOKEN_RE.findall((text or '').lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def trigrams(term):
+    """Return the padded trigram set of a term, pg_trgm style."""
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Weighted inverted index over active resources with trigram fuzzy matching.
+
+    The index is built lazily on first use (with a database backend, by the
+    first query full-text search can't answer) and then kept current by the
+    signal handlers in ``vault.signals``. Each update is recorded in
+    ``changes``; other processes replay the resources recorded since their
+    last look before the next search, and only rebuild after an
+    ``invalidate()`` or when they have fallen too far behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.built = False
+        self.generation = None
+        self.postings = defaultdict(dict)     # term -> {resource_id: weight}
+        self.doc_terms = {}                   # resource_id -> {term: weight}
+        self.doc_meta = {}                    # resource_id -> (subject_id, branch_id, semester, type)
+        self.term_trigrams = {}               # term -> trigram set
+        self.trigram_terms = defaultdict(set) # trigram -> {term}
+
+    # -- maintenance -----------------------------------------------------
+
+    def build(self):
+        """(Re)build the whole index from the database in one query."""
+        with self._lock:
+            self._reset()
+            # Read first: a change recorded during the build is replayed after it.
+            generation = changes.current()
+            for resource in self._resources().iterator(chunk_size=2000):
+                self._add(resource)
+            self.built = True
+            self.generation = generation
+
+    def ensure_current(self):
+        """Build the index, or replay the resources other processes re-indexed since."""
+        with self._lock:
+            caught_up = changes.since(self.generation) if self.built else None
+            if caught_up is None or None in caught_up[1]:
+                self.build()
+                return
+            generation, scopes = caught_up
+            for filters in scopes:
+                self._reindex(filters)
+            self.generation = generation
+
+    def invalidate(self):
+        """Drop the index after bulk writes that bypass signals; it rebuilds on next use."""
+        with self._lock:
+            self.built = False
+            self._record(None)
+
+    def update_resource(self, resource):
+        """Index a saved resource, dropping it if it is no longer active."""
+        with self._lock:
+            if self.built:
+                self._remove(resource.pk)
+                if resource.is_active:
+                    self._add(resource)
+            self._record({'pk': resource.pk})
+
+    def remove_resource(self, resource_id):
+        with self._lock:
+            if self.built:
+                self._remove(resource_id)
+            self._record({'pk': resource_id})
+
+    def reindex(self, **filters):
+        """Re-index every resource matching ``filters`` (e.g. after a subject edit)."""
+        with self._lock:
+            if self.built:
+                self._reindex(filters)
+            self._record(filters)
+
+    def _reindex(self, filters):
+        if 'pk' in filters:
+            # A deactivated or deleted resource is simply not found again.
+            self._remove(filters['pk'])
+        else:
+            stale = [doc_id for doc_id in self.doc_meta if self._in_scope(doc_id, filters)]
+            for doc_id in stale:
+                self._remove(doc_id)
+        for resource in self._resources().filter(**filters):
+            self._add(resource)
+
+    def _in_scope(self, doc_id, filters):
+        subject_id, branch_id, _, _ = self.doc_meta[doc_id]
+        if 'subject_id' in filters:
+            return subject_id == filters['subject_id']
+        if 'subject__branch_id' in filters:
+            return branch_id == filters['subject__branch_id']
+        return True
+
+    def _record(self, filters):
+        generation = changes.record(filters)
+        # Only skip ahead when no other process recorded a change in between.
+        if self.built and generation == self.generation + 1:
+            self.generation = generation
+
+    @staticmethod
+    def _resources():
+        return Resource.objects.filter(is_active=True).select_related('subject__branch').only(
+            'id', 'title', 'description', 'resource_type', 'is_active',
+            'subject__id', 'subject__name', 'subject__code', 'subject__semester',
+            'subject__branch__id', 'subject__branch__code',
+        )
+
+    def _add(self, resource):
+        subject = resource.subject
+        fields = {
+            'title': resource.title,
+            'description': resource.description,
+            'subject': f'{subject.name} {subject.code}',
+            'branch': subject.branch.code,
+        }
+        weights = Counter()
+        for field, text in fields.items():
+            for term in tokenize(text):
+                weights[term] += FIELD_WEIGHTS[field]
+
+        doc_id = resource.pk
+        self.doc_terms[doc_id] = dict(weights)
+        self.doc_meta[doc_id] = (subject.pk, subject.branch_id, subject.semester, resource.resource_type)
+        for term, weight in weights.items():
+            self.postings[term][doc_id] = weight
+            if term not in self.term_trigrams:
+                grams = trigrams(term)
+                self.term_trigrams[term] = grams
+                for gram in grams:
+                    self.trigram_terms[gram].add(term)
+
+    def _remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        del self.doc_meta[doc_id]
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+                for gram in self.term_trigrams.pop(term, ()):
+                    self.trigram_terms[gram].discard(term)
+
+    # -- querying --------------------------------------------------------
+
+    def _expand(self, term):
+        """Return ``[(vocabulary_term, similarity)]`` for a query term."""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < 3:
+            return []
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self.trigram_terms.get(gram, ()):
+                shared[candidate] += 1
+        scored = []
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + len(self.term_trigrams[candidate]) - common)
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((candidate, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:FUZZY_EXPANSIONS]
+
+    def search(self, query, branch_id=None, semester=None, resource_type=None, limit=50):
+        """
+        Return resource ids ranked by relevance to ``query``.
+
+        Results matching more query terms always rank first; ties are broken
+        by a field-weighted TF-IDF score scaled by fuzzy similarity.
+        """
+        self.ensure_current()
+        with self._lock:
+            total_docs = len(self.doc_terms) or 1
+            scores = Counter()
+            coverage = Counter()
+            for term in dict.fromkeys(tokenize(query)):
+                contribution = {}
+                for vocab_term, similarity in self._expand(term):
+                    docs = self.postings[vocab_term]
+                    idf = math.log(1 + total_docs / len(docs))
+                    for doc_id, weight in docs.items():
+                        score = similarity * idf * weight
+                        if score > contribution.get(doc_id, 0.0):
+                            contribution[doc_id] = score
+                for doc_id, score in contribution.items():
+                    scores[doc_id] += score
+                    coverage[doc_id] += 1
+
+            hits = []
+            for doc_id, score in scores.items():
+                _, doc_branch, doc_semester, doc_type = self.doc_meta[doc_id]
+                if branch_id is not None and doc_branch != branch_id:
+                    continue
+                if semester is not None and doc_semester != semester:
+                    continue
+                if resource_type and doc_type != resource_type:
+                    continue
+                hits.append((coverage[doc_id], score, doc_id))
+        hits.sort(reverse=True)
+        return [doc_id for _, _, doc_id in hits[:limit]]
+
+
+index = SearchIndex()
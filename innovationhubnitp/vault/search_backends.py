@@ -0,0 +1,149 @@
+"""
+Pluggable search backends for vault resources.
+
+All backends expose the same ``search()`` call returning ranked resource ids:
+
+* ``postgresql`` - a ``search_vector`` tsvector column on ``vault_resource`` with a
+  GIN index, maintained by triggers on resource, subject and branch tables.
+* ``sqlite`` - an FTS5 shadow table ``vault_resource_fts`` maintained by triggers.
+* ``memory`` - the in-process index from ``vault.search`` (any other database).
+
+The database backends fall back to the in-process index, which tolerates typos,
+for queries full-text search finds nothing for.
+
+The database objects are created by migration ``0002_resource_search``. SQLite
+rebuilds a table to alter it and refuses while triggers on the other vault tables
+reference it, so migrations that alter ``vault_resource``, ``vault_subject`` or
+``vault_branch`` must drop the triggers before their schema operations and
+reinstall them after, as ``0003_resource_url_key`` does.
+"""
+import abc
+
+from django.conf import settings
+from django.db import connection
+
+from .search import index as memory_index, tokenize
+
+
+class MemorySearchBackend:
+    """Rank with the in-process inverted index (supports fuzzy matching)."""
+
+    name = 'memory'
+
+    def search(self, query, branch_id=None, semester=None, resource_type=None, limit=50):
+        return memory_index.search(
+            query, branch_id=branch_id, semester=semester, resource_type=resource_type, limit=limit
+        )
+
+
+class DatabaseSearchBackend(abc.ABC):
+    """Shared query plumbing for backends that rank inside the database."""
+
+    @abc.abstractmethod
+    def match_expression(self, terms):
+        """The query parameter matching every term in ``terms``, as prefixes."""
+
+    @abc.abstractmethod
+    def ranked_sql(self, filters):
+        """
+        SQL selecting matching resource ids, best first.
+
+        Takes the match expression and the limit as parameters, around the
+        ``filters`` SQL appended to its WHERE clause.
+        """
+
+    def search(self, query, branch_id=None, semester=None, resource_type=None, limit=50):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        filters = []
+        params = [self.match_expression(terms)]
+        if branch_id is not None:
+            filters.append('s.branch_id = %s')
+            params.append(branch_id)
+        if semester is not None:
+            filters.append('s.semester = %s')
+            params.append(semester)
+        if resource_type:
+            filters.append('r.resource_type = %s')
+            params.append(resource_type)
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(self.ranked_sql(''.join(f' AND {f}' for f in filters)), params)
+            ranked = [row[0] for row in cursor.fetchall()]
+        if ranked:
+            return ranked
+        # Full-text search only matches words and prefixes; when a typo leaves
+        # it empty-handed, rank with the fuzzy in-process index instead.
+        return memory_index.search(
+            query, branch_id=branch_id, semester=semester, resource_type=resource_type, limit=limit
+        )
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    """Full-text search on a trigger-maintained tsvector column with a GIN index."""
+
+    name = 'postgresql'
+
+    def match_expression(self, terms):
+        # Terms are [a-z0-9]+ only, so they are safe inside tsquery syntax.
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def ranked_sql(self, filters):
+        return f"""
+            SELECT r.id
+            FROM vault_resource r
+            JOIN vault_subject s ON s.id = r.subject_id,
+                 to_tsquery('english', %s) query
+            WHERE r.is_active AND r.search_vector @@ query{filters}
+            ORDER BY ts_rank(r.search_vector, query) DESC, r.id DESC
+            LIMIT %s
+        """
+
+
+class SQLiteSearchBackend(DatabaseSearchBackend):
+    """Full-text search on a trigger-maintained FTS5 shadow table."""
+
+    name = 'sqlite'
+
+    def match_expression(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def ranked_sql(self, filters):
+        # bm25() column weights follow vault.search.FIELD_WEIGHTS; lower is better.
+        return f"""
+            SELECT r.id
+            FROM vault_resource_fts f
+            JOIN vault_resource r ON r.id = f.rowid
+            JOIN vault_subject s ON s.id = r.subject_id
+            WHERE vault_resource_fts MATCH %s AND r.is_active{filters}
+            ORDER BY bm25(vault_resource_fts, 3.0, 2.0, 1.5, 1.0), r.id DESC
+            LIMIT %s
+        """
+
+
+BACKENDS = {
+    'memory': MemorySearchBackend,
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def backend_for(vendor):
+    """Return the native backend for a database vendor, or the in-memory one."""
+    return BACKENDS.get(vendor, MemorySearchBackend)()
+
+
+def get_backend():
+    """Return the configured backend (``VAULT_SEARCH_BACKEND``) or the database's native one."""
+    name = getattr(settings, 'VAULT_SEARCH_BACKEND', None)
+    if name:
+        return BACKENDS[name]()
+    return backend_for(connection.vendor)
+
+
+def search(query, branch_id=None, semester=None, resource_type=None, limit=50):
+    """Return active resource ids ranked by relevance to ``query``."""
+    return get_backend().search(
+        query, branch_id=branch_id, semester=semester, resource_type=resource_type, limit=limit
+    )
@@ -0,0 +1,46 @@
+"""Signal handlers that keep vault caches and the search index in sync."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Branch, Subject, Resource
+from .facets import invalidate_facets
+from .search import index
+
+
+@receiver(post_save, sender=Resource)
+def index_resource(sender, instance, **kwargs):
+    """Re-index a resource once its save has been committed."""
+    transaction.on_commit(lambda: index.update_resource(instance))
+
+
+@receiver(post_delete, sender=Resource)
+def unindex_resource(sender, instance, **kwargs):
+    """Drop a deleted resource from the search index."""
+    resource_id = instance.pk
+    transaction.on_commit(lambda: index.remove_resource(resource_id))
+
+
+@receiver(post_save, sender=Subject)
+def reindex_subject(sender, instance, **kwargs):
+    """Subject name/code are indexed on every resource of the subject."""
+    subject_id = instance.pk
+    transaction.on_commit(lambda: index.reindex(subject_id=subject_id))
+
+
+@receiver(post_save, sender=Branch)
+def reindex_branch(sender, instance, **kwargs):
+    """Branch code is indexed on every resource of the branch."""
+    branch_id = instance.pk
+    transaction.on_commit(lambda: index.reindex(subject__branch_id=branch_id))
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def clear_facets(sender, **kwargs):
+    """Facet counts and cached catalog pages show resources, subjects and branches."""
+    transaction.on_commit(invalidate_facets)
@@ -1,3 +1,433 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.caching import reset_local_caches
+from core.tests import QueryBudgetTestCase
+
+from . import search_backends
+from .export import EXPORT_COLUMNS
+from .facets import catalog_cache
+from .linkcheck import LinkChecker
+from .models import Branch, Resource, Subject, url_key_for
+from .search import SearchIndex, index as search_index
+
+
+class VaultQueryBudgetTests(QueryBudgetTestCase):
+
+    def grow(self, rows):
+        """Add a branch with ``rows`` subjects of three resources each."""
+        n = Branch.objects.count()
+        branch = Branch.objects.create(name=f'Branch {n}', code=f'B{n}')
+        subjects = Subject.objects.bulk_create([
+            Subject(name=f'Subject {n}.{i}', code=f'S{n}-{i}', branch=branch, semester=i % 8 + 1)
+            for i in range(rows)
+        ])
+        Resource.objects.bulk_create([
+            Resource(
+                subject=subject, title=f'{subject.name} {resource_type}', resource_type=resource_type,
+                exam_type='END', file_url=f'https://example.com/{subject.code}/{resource_type}',
+                url_key=url_key_for(f'https://example.com/{subject.code}/{resource_type}'),
+                is_verified=resource_type == 'PYQ',
+            )
+            for subject in subjects
+            for resource_type in ('PYQ', 'NOTES', 'BOOK')
+        ])
+
+    def test_vault_list(self):
+        # Branches, facet counts, the subject page, its resources, site chrome.
+        self.assertQueryBudget(reverse('vault:list'), 6, self.grow)
+
+    def test_resources(self):
+        # Count, the resource page with subjects and branches, branches, site chrome.
+        self.assertQueryBudget(reverse('vault:resources'), 5, self.grow)
+
+    # As for the core changelists; the subject and resource branch filters
+    # each list the branches.
+    ADMIN_BUDGETS = {
+        'branch': 8,
+        'subject': 9,
+        'resource': 9,
+    }
+
+    def test_admin_changelists(self):
+        self.login_superuser()
+        for model, budget in self.ADMIN_BUDGETS.items():
+            with self.subTest(model=model):
+                self.assertQueryBudget(reverse(f'admin:vault_{model}_changelist'), budget, self.grow)
+
+
+class VaultListParameterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_local_caches()
+        branch = Branch.objects.create(name='Computer Science', code='CSE')
+        subject = Subject.objects.create(name='Compilers', code='CS501', branch=branch, semester=5)
+        Resource.objects.create(subject=subject, title='Compilers PYQ', resource_type='PYQ',
+                                file_url='https://drive.google.com/compilers')
+
+    def test_junk_filters_are_ignored(self):
+        response = self.client.get(reverse('vault:list'), {'branch': 'abc', 'semester': 'x', 'type': 'EXE'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Compilers PYQ')
+
+    def test_bad_cursors_share_the_first_page_entry(self):
+        self.client.get(reverse('vault:list'))
+        cached = len(catalog_cache.l1)
+        for cursor in ('junk', 'more-junk', 'W1sIkEiXQ:forged'):
+            response = self.client.get(reverse('vault:list'), {'cursor': cursor})
+            self.assertContains(response, 'Compilers PYQ')
+        self.assertEqual(len(catalog_cache.l1), cached)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ece = Branch.objects.create(name='Electronics & Communication', code='ECE')
+        dsp = Subject.objects.create(name='Digital Signal Processing', code='EC401', branch=ece, semester=7)
+        circuits = Subject.objects.create(name='Network Analysis', code='EC201', branch=ece, semester=3)
+        cls.titled = Resource.objects.create(
+            subject=circuits, title='Digital signal basics', resource_type='NOTES',
+            file_url='https://drive.google.com/basics',
+        )
+        cls.described = Resource.objects.create(
+            subject=circuits, title='Network theorems', resource_type='NOTES',
+            description='Revision sheet with a digital appendix', file_url='https://drive.google.com/theorems',
+        )
+        cls.pyq = Resource.objects.create(
+            subject=dsp, title='DSP end-semester 2023', resource_type='PYQ', file_url='https://drive.google.com/dsp',
+        )
+
+    def setUp(self):
+        # Signals re-index on commit, which test transactions never reach.
+        search_index.invalidate()
+
+    def test_title_matches_outrank_description_matches(self):
+        ranked = search_backends.search('digital')
+        self.assertLess(ranked.index(self.titled.pk), ranked.index(self.described.pk))
+
+    def test_filters_narrow_the_results(self):
+        self.assertEqual(search_backends.search('digital signal', semester=7), [self.pyq.pk])
+        self.assertEqual(search_backends.search('digital', resource_type='PYQ'), [self.pyq.pk])
+
+    def test_typos_fall_back_to_the_fuzzy_index(self):
+        self.assertEqual(search_backends.search('dgital signl', semester=7), [self.pyq.pk])
+
+    def test_other_processes_replay_edits_instead_of_rebuilding(self):
+        other = SearchIndex()
+        other.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pyq.title = 'DSP quiz 2023'
+            self.pyq.save()
+        with mock.patch.object(other, 'build', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(other.search('quiz'), [self.pyq.pk])
+            self.assertNotIn(self.pyq.pk, other.search('semester'))
+
+    def test_a_database_backend_must_implement_its_sql(self):
+        class MatchOnly(search_backends.DatabaseSearchBackend):
+            def match_expression(self, terms):
+                return ' '.join(terms)
+
+        with self.assertRaises(TypeError):
+            MatchOnly()
+
+
+class FacetCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cse = Branch.objects.create(name='Computer Science', code='CSE')
+        cls.ece = Branch.objects.create(name='Electronics & Communication', code='ECE')
+        compilers = Subject.objects.create(name='Compilers', code='CS501', branch=cls.cse, semester=5)
+        dbms = Subject.objects.create(name='Databases', code='CS301', branch=cls.cse, semester=3)
+        dsp = Subject.objects.create(name='Digital Signal Processing', code='EC501', branch=cls.ece, semester=5)
+        for number, (subject, resource_type) in enumerate([
+            (compilers, 'PYQ'), (compilers, 'PYQ'), (compilers, 'NOTES'), (dbms, 'PYQ'), (dsp, 'PYQ'),
+        ]):
+            Resource.objects.create(subject=subject, title=f'Resource {number}', resource_type=resource_type,
+                                    file_url=f'https://drive.google.com/{number}')
+        Resource.objects.create(subject=compilers, title='Withdrawn', resource_type='PYQ', is_active=False,
+                                file_url='https://drive.google.com/withdrawn')
+
+    def setUp(self):
+        cache.clear()
+        reset_local_caches()
+
+    def facets(self, **params):
+        context = self.client.get(reverse('vault:list'), params).context
+        return {
+            'branches': [(branch.code, count) for branch, count in context['branch_options']],
+            'semesters': context['semester_options'],
+            'types': {value: count for value, _, count in context['resource_type_options']},
+            'total': context['facet_total'],
+        }
+
+    def test_each_dropdown_counts_with_the_other_filters_applied(self):
+        self.assertEqual(self.facets(branch=self.cse.pk, semester=5), {
+            'branches': [('CSE', 3), ('ECE', 1)],
+            'semesters': [(3, 1), (5, 3)],
+            'types': {'PYQ': 2, 'NOTES': 1},
+            'total': 3,
+        })
+        self.assertEqual(self.facets(branch=self.cse.pk, type='PYQ'), {
+            'branches': [('CSE', 3), ('ECE', 1)],
+            'semesters': [(3, 1), (5, 2)],
+            'types': {'PYQ': 3, 'NOTES': 1},
+            'total': 3,
+        })
+
+    def test_selected_options_stay_listed_when_empty(self):
+        facets = self.facets(branch=self.ece.pk, semester=3)
+        self.assertEqual(facets['branches'], [('CSE', 1), ('ECE', 0)])
+        self.assertEqual(facets['total'], 0)
+
+
+class ResourceApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_local_caches()
+        branch = Branch.objects.create(name='Computer Science', code='CSE')
+        subject = Subject.objects.create(name='Compilers', code='CS501', branch=branch, semester=5)
+        self.resource = Resource.objects.create(subject=subject, title='Compilers PYQ', resource_type='PYQ',
+                                                file_url='https://drive.google.com/compilers')
+        self.url = reverse('vault:api_resources')
+
+    def test_unchanged_listing_is_answered_with_304(self):
+        response = self.client.get(self.url, {'type': 'PYQ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'type': 'PYQ'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # Other filters and later edits both miss the stored ETag.
+        self.assertEqual(self.client.get(self.url, {'type': 'NOTES'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.resource.title = 'Compilers PYQ 2024'
+        self.resource.save()
+        response = self.client.get(self.url, {'type': 'PYQ'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['title'], 'Compilers PYQ 2024')
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cse = Branch.objects.create(name='Computer Science', code='CSE')
+        compilers = Subject.objects.create(name='Compilers', code='CS501', branch=cse, semester=5)
+        cls.pyq = Resource.objects.create(subject=compilers, title='Compilers, end-sem "2023"', resource_type='PYQ',
+                                          file_url='https://drive.google.com/compilers')
+        cls.notes = Resource.objects.create(subject=compilers, title='Parsing notes', resource_type='NOTES',
+                                            file_url='https://drive.google.com/parsing')
+        cls.staff = get_user_model().objects.create_user('staff', 'staff@nitp.ac.in', 'pw', is_staff=True)
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('vault:export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_body_has_a_header_and_one_quoted_row_per_resource(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="vault-resources-\d{8}\.csv"$')
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(list(rows[0]), [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual([row['id'] for row in rows], [str(self.pyq.pk), str(self.notes.pk)])
+        self.assertEqual(rows[0]['title'], 'Compilers, end-sem "2023"')
+        self.assertEqual(rows[0]['uploaded_at'], self.pyq.uploaded_at.isoformat())
+        self.assertEqual(rows[1]['branch_code'], 'CSE')
+
+    def test_filters_and_jsonl(self):
+        _, body = self.export(type='NOTES', format='jsonl')
+        lines = body.splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['title'], 'Parsing notes')
+
+    def test_staff_only(self):
+        self.client.logout()
+        response = self.client.get(reverse('vault:export'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ResourceUrlKeyTests(TestCase):
+
+    def setUp(self):
+        branch = Branch.objects.create(name='Computer Science', code='CSE')
+        self.subject = Subject.objects.create(name='Compilers', code='CS501', branch=branch, semester=5)
+        self.original = Resource.objects.create(subject=self.subject, title='Compilers PYQ', resource_type='PYQ',
+                                                file_url='https://drive.google.com/file/d/abc123/view')
+
+    def test_same_file_is_rejected_under_another_link_shape(self):
+        duplicate = Resource(subject=self.subject, title='Again', resource_type='PYQ',
+                             file_url='https://drive.google.com/open?id=abc123')
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+
+    def test_legacy_duplicate_without_key_stays_editable(self):
+        legacy = Resource.objects.create(subject=self.subject, title='Compilers notes', resource_type='NOTES',
+                                         file_url='https://example.com/legacy.pdf')
+        # As the url_key migration leaves a later duplicate of a link.
+        Resource.objects.filter(pk=legacy.pk).update(file_url=self.original.file_url, url_key=None)
+
+        legacy = Resource.objects.get(pk=legacy.pk)
+        legacy.is_active = False
+        legacy.full_clean()
+        legacy.save()
+        legacy.refresh_from_db()
+        self.assertFalse(legacy.is_active)
+        self.assertIsNone(legacy.url_key)
+
+    def test_changing_the_link_rekeys(self):
+        self.original.file_url = 'https://example.com/compilers.pdf'
+        self.original.save(update_fields=['file_url'])
+        self.original.refresh_from_db()
+        self.assertEqual(self.original.url_key, url_key_for('https://example.com/compilers.pdf'))
+
+    def test_long_links_sharing_a_prefix_get_distinct_keys(self):
+        # Percent-encoding makes the normalized link far longer than the one typed.
+        prefix = 'https://example.com/notes?q=' + 'न' * 40
+        first = Resource.objects.create(subject=self.subject, title='One', resource_type='NOTES', file_url=prefix + '1')
+        second = Resource(subject=self.subject, title='Two', resource_type='NOTES', file_url=prefix + '2')
+        second.full_clean()
+        second.save()
+        self.assertNotEqual(first.url_key, second.url_key)
+
+
+class ImportResourcesTests(TestCase):
+
+    HEADER = 'title,file_url,resource_type,branch_code,subject_code,subject_name,semester\n'
+
+    def setUp(self):
+        self.branch = Branch.objects.create(name='Computer Science', code='CSE')
+
+    def run_import(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8') as handle:
+            handle.write(self.HEADER + ''.join(f'{row}\n' for row in rows))
+            handle.flush()
+            call_command('import_resources', handle.name, stdout=StringIO(), stderr=StringIO())
+
+    def test_links_to_the_same_file_are_imported_once(self):
+        self.run_import([
+            'Compilers PYQ,https://drive.google.com/file/d/abc123/view?usp=sharing,PYQ,CSE,CS501,Compilers,5',
+            'Compilers PYQ copy,https://drive.google.com/open?id=abc123,PYQ,cse,CS501,Compilers,5',
+            'Compilers notes,https://www.example.com/compilers/?utm_source=x,NOTES,CSE,CS501,Compilers,5',
+        ])
+        self.assertEqual(Resource.objects.count(), 2)
+        self.assertEqual(Subject.objects.count(), 1)
+
+    def test_reimport_updates_in_place(self):
+        self.run_import(['Compilers PYQ,https://example.com/compilers.pdf,PYQ,CSE,CS501,Compilers,5'])
+        self.run_import(['Compilers PYQ 2023,http://example.com/compilers.pdf/,PYQ,CSE,CS501,Compilers,5'])
+        self.assertEqual(list(Resource.objects.values_list('title', flat=True)), ['Compilers PYQ 2023'])
+
+    def test_subjects_without_a_code_are_matched_by_name(self):
+        existing = Subject.objects.create(name='Seminar', code='', branch=self.branch, semester=8)
+        self.run_import([
+            'Seminar guide,https://example.com/seminar.pdf,NOTES,CSE,,seminar,8',
+            'Project report,https://example.com/project.pdf,NOTES,CSE,,Project seminar,8',
+        ])
+        # The branch and semester's one blank code is taken, so the second row can't get a subject.
+        self.assertEqual(list(Resource.objects.values_list('title', 'subject')), [('Seminar guide', existing.pk)])
+        self.assertEqual(Subject.objects.count(), 1)
+
+    def test_reimport_keeps_moderation_state(self):
+        self.run_import(['Compilers PYQ,https://example.com/compilers.pdf,PYQ,CSE,CS501,Compilers,5'])
+        Resource.objects.update(is_verified=True, is_active=False, uploaded_by='moderator')
+        self.run_import(['Compilers PYQ 2023,https://example.com/compilers.pdf,PYQ,CSE,CS501,Compilers,5'])
+        self.assertEqual(
+            list(Resource.objects.values_list('title', 'is_verified', 'is_active', 'uploaded_by')),
+            [('Compilers PYQ 2023', True, False, 'moderator')],
+        )
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Answers the link checker like the hosts it meets: fine, gone, moved, slow or HEAD-averse."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, body):
+        path = unquote(self.path)
+        if path in ('/ok', '/नोट्स.pdf'):
+            status, headers = 200, {}
+        elif path == '/moved':
+            status, headers = 301, {'Location': '/ok'}
+        elif path == '/slow':
+            time.sleep(1)
+            status, headers = 200, {}
+        elif path == '/no-head':
+            status, headers = (405, {}) if self.command == 'HEAD' else (206, {})
+        else:
+            status, headers = 404, {}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._reply(b'')
+
+    def do_GET(self):
+        self._reply(b'x')
+
+    def log_message(self, *args):
+        pass
+
+
+class LinkCheckerTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def check(self, *paths):
+        results = {}
+
+        async def record(pk, status_code):
+            results[pk] = status_code
+
+        links = [(path, self.base + path) for path in paths]
+        asyncio.run(LinkChecker(per_host=2, rate=0, timeout=0.3).run(links, record))
+        return results
+
+    def test_statuses(self):
+        self.assertEqual(
+            self.check('/ok', '/missing', '/moved', '/no-head', '/slow'),
+            {'/ok': 200, '/missing': 404, '/moved': 200, '/no-head': 206, '/slow': None},
+        )
+
+    def test_non_ascii_path_is_percent_encoded(self):
+        self.assertEqual(self.check('/नोट्स.pdf', '/ok'), {'/नोट्स.pdf': 200, '/ok': 200})
@@ -7,4 +7,6 @@ app_name = 'vault'
 urlpatterns = [
     path('', views.vault_list, name='list'),
     path('resources/', views.VaultListView.as_view(), name='resources'),
+    path('api/resources/', views.resource_api, name='api_resources'),
+    path('export/', views.export_resources, name='export'),
 ]
@@ -1,47 +1,160 @@
+import hashlib
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.shortcuts import render
+from django.views.decorators.http import condition, require_GET
 from django.views.generic import ListView
-from django.db.models import Q, Prefetch
+from django.db.models import Case, Count, Exists, Max, OuterRef, Q, Prefetch, When, prefetch_related_objects
 from .models import Branch, Subject, Resource
+from .pagination import decode_cursor, paginate_subjects
+from . import search_backends
+from .export import EXPORT_FORMATS, export_lines, export_rows
+from .facets import FacetCounts, catalog_cache
+
+
+SUBJECTS_PER_PAGE = 10
+SEARCH_RESULT_LIMIT = 50
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+
+
+def _as_int(value):
+    try:
+        return int(value) if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _facet_context(branches, branch_id, semester, resource_type):
+    """Dropdown options with resource counts, from the cached facet matrix."""
+    facets = FacetCounts(_as_int(branch_id), _as_int(semester), resource_type)
+    return {
+        'branch_options': facets.branch_options(branches),
+        'semester_options': facets.semester_options(range(1, 9)),
+        'resource_type_options': facets.resource_type_options(Resource.RESOURCE_TYPE_CHOICES),
+        'facet_total': facets.total,
+    }
+
+
+def _ranked_ids(query, branch_id, semester, resource_type):
+    """Return resource ids for ``query`` ranked by the configured search backend."""
+    return search_backends.search(
+        query,
+        branch_id=_as_int(branch_id),
+        semester=_as_int(semester),
+        resource_type=resource_type,
+        limit=SEARCH_RESULT_LIMIT,
+    )
+
+
+def _filter_resources(params):
+    """Active resources narrowed by the ``branch``/``semester``/``type`` query parameters."""
+    qs = Resource.objects.filter(is_active=True)
+
+    branch_id = _as_int(params.get('branch'))
+    semester = _as_int(params.get('semester'))
+    resource_type = params.get('type')
+    if branch_id:
+        qs = qs.filter(subject__branch_id=branch_id)
+    if semester:
+        qs = qs.filter(subject__semester=semester)
+    if resource_type:
+        qs = qs.filter(resource_type=resource_type)
+    return qs
+
+
+def _order_by_search_rank(qs, query, params):
+    """Restrict ``qs`` to search hits for ``query``, ordered by rank."""
+    ranked_ids = _ranked_ids(query, params.get('branch'), params.get('semester'), params.get('type'))
+    if not ranked_ids:
+        return qs.none()
+    rank = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)])
+    return qs.filter(pk__in=ranked_ids).order_by(rank)
+
+
+def _search_results(query, branch_id, semester, resource_type):
+    """Rank resources for ``query`` with the search backend and group them by subject."""
+    ranked_ids = _ranked_ids(query, branch_id, semester, resource_type)
+    found = Resource.objects.select_related('subject__branch').in_bulk(ranked_ids)
+
+    # Subjects appear in the order of their best-ranked resource
+    subject_resources = {}
+    for resource_id in ranked_ids:
+        resource = found.get(resource_id)
+        if resource is None:
+            continue
+        item = subject_resources.setdefault(
+            resource.subject_id, {'subject': resource.subject, 'resources': []}
+        )
+        item['resources'].append(resource)
+    return subject_resources, len(found)
+
+
+def _catalog_page(subject_filter, matching, cursor):
+    """One page of subjects with at least one matching resource, resources prefetched."""
+    # Page over subjects that have at least one matching resource, then fetch
+    # only the page's resources in a single prefetch query.
+    subjects = Subject.objects.filter(
+        subject_filter,
+        Exists(matching.filter(subject_id=OuterRef('pk'))),
+    ).select_related('branch')
+    page_subjects, next_cursor = paginate_subjects(subjects, cursor, SUBJECTS_PER_PAGE)
+    prefetch_related_objects(
+        page_subjects,
+        Prefetch('resources', queryset=matching.order_by('-uploaded_at'), to_attr='vault_resources'),
+    )
+    return page_subjects, next_cursor
 
 
 def vault_list(request):
-    """Display resources with filtering by branch and semester."""
-    branches = Branch.objects.filter(is_active=True)
-    subjects = Subject.objects.filter(is_active=True).select_related('branch')
+    """Display resources grouped by subject: keyset-paginated, or ranked when ``q`` is given."""
+    branches = catalog_cache.get_or_set('branches', lambda: list(Branch.objects.filter(is_active=True)))
     # Show all active resources; verified ones get a badge
-    resources = Resource.objects.filter(is_active=True).select_related('subject__branch')
+    matching = Resource.objects.filter(is_active=True)
 
-    # Get filter parameters
-    branch_id = request.GET.get('branch')
-    semester = request.GET.get('semester')
+    # Get filter parameters; junk values are ignored rather than cached or
+    # passed to the database.
+    branch_id = _as_int(request.GET.get('branch'))
+    semester = _as_int(request.GET.get('semester'))
     resource_type = request.GET.get('type')
+    if resource_type not in dict(Resource.RESOURCE_TYPE_CHOICES):
+        resource_type = None
+    query = request.GET.get('q', '').strip()
+    subject_filter = Q()
 
     # Apply filters
     if branch_id:
-        subjects = subjects.filter(branch_id=branch_id)
-        resources = resources.filter(subject__branch_id=branch_id)
+        subject_filter &= Q(branch_id=branch_id)
 
     if semester:
-        try:
-            semester = int(semester)
-            subjects = subjects.filter(semester=semester)
-            resources = resources.filter(subject__semester=semester)
-        except (ValueError, TypeError):
-            pass
+        subject_filter &= Q(semester=semester)
 
     if resource_type:
-        resources = resources.filter(resource_type=resource_type)
+        matching = matching.filter(resource_type=resource_type)
 
-    # Group resources by subject for better organization
-    subject_resources = {}
-    for resource in resources:
-        subject_id = resource.subject_id
-        if subject_id not in subject_resources:
-            subject_resources[subject_id] = {
-                'subject': resource.subject,
-                'resources': []
-            }
-        subject_resources[subject_id]['resources'].append(resource)
+    facets = _facet_context(branches, branch_id, semester, resource_type)
+
+    if query:
+        subject_resources, total_resources = _search_results(query, branch_id, semester, resource_type)
+        cursor = next_cursor = None
+    else:
+        # Keyed on the decoded cursor, so a forged or garbled one is served
+        # (and cached) as the first page instead of adding a new entry.
+        cursor = decode_cursor(request.GET.get('cursor'))
+        page_subjects, next_cursor = catalog_cache.get_or_set(
+            ('page', branch_id, semester, resource_type, cursor),
+            lambda: _catalog_page(subject_filter, matching, cursor),
+        )
+
+        # Group resources by subject for better organization
+        subject_resources = {
+            subject.id: {'subject': subject, 'resources': subject.vault_resources}
+            for subject in page_subjects
+        }
+        # Exact total for the filters, read from the cached facet matrix
+        total_resources = facets['facet_total']
 
     context = {
         'branches': branches,
@@ -52,8 +165,12 @@ def vault_list(request):
         'selected_branch': branch_id,
         'selected_semester': semester,
         'selected_type': resource_type,
-        'total_resources': resources.count(),
+        'total_resources': total_resources,
+        'search_query': query,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
     }
+    context.update(facets)
     return render(request, 'vault.html', context)
 
 
@@ -65,24 +182,10 @@ class VaultListView(ListView):
     paginate_by = 50
 
     def get_queryset(self):
-        qs = Resource.objects.filter(
-            is_active=True
-        ).select_related('subject__branch')
-
-        branch_id = self.request.GET.get('branch')
-        semester = self.request.GET.get('semester')
-        resource_type = self.request.GET.get('type')
-
-        if branch_id:
-            qs = qs.filter(subject__branch_id=branch_id)
-        if semester:
-            try:
-                qs = qs.filter(subject__semester=int(semester))
-            except (ValueError, TypeError):
-                pass
-        if resource_type:
-            qs = qs.filter(resource_type=resource_type)
-
+        qs = _filter_resources(self.request.GET).select_related('subject__branch')
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            return _order_by_search_rank(qs, query, self.request.GET)
         return qs.order_by('-uploaded_at')
 
     def get_context_data(self, **kwargs):
@@ -94,4 +197,127 @@ class VaultListView(ListView):
         context['selected_branch'] = self.request.GET.get('branch')
         context['selected_semester'] = self.request.GET.get('semester')
         context['selected_type'] = self.request.GET.get('type')
+        context['search_query'] = self.request.GET.get('q', '').strip()
+        context.update(_facet_context(
+            context['branches'],
+            context['selected_branch'],
+            context['selected_semester'],
+            context['selected_type'],
+        ))
         return context
+
+
+API_FIELDS = (
+    'id', 'title', 'description', 'resource_type', 'exam_type', 'file_url',
+    'uploaded_by', 'uploaded_at', 'updated_at', 'is_verified',
+    'subject_id', 'subject__name', 'subject__code', 'subject__semester',
+    'subject__branch_id', 'subject__branch__code', 'subject__branch__name',
+)
+
+
+def _api_validator(request):
+    """Latest ``updated_at`` and row count for the request's filters, computed once per request."""
+    if not hasattr(request, '_vault_validator'):
+        request._vault_validator = _filter_resources(request.GET).aggregate(
+            last_modified=Max('updated_at'), total=Count('id'),
+        )
+    return request._vault_validator
+
+
+def _api_etag(request):
+    validator = _api_validator(request)
+    last_modified = validator['last_modified']
+    raw = '{}:{}:{}'.format(
+        last_modified.isoformat() if last_modified else '-',
+        validator['total'],
+        request.GET.urlencode(),
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _api_last_modified(request):
+    return _api_validator(request)['last_modified']
+
+
+def _serialize_resource(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'resource_type': row['resource_type'],
+        'exam_type': row['exam_type'],
+        'file_url': row['file_url'],
+        'uploaded_by': row['uploaded_by'],
+        'uploaded_at': row['uploaded_at'],
+        'updated_at': row['updated_at'],
+        'is_verified': row['is_verified'],
+        'subject': {
+            'id': row['subject_id'],
+            'name': row['subject__name'],
+            'code': row['subject__code'],
+            'semester': row['subject__semester'],
+        },
+        'branch': {
+            'id': row['subject__branch_id'],
+            'code': row['subject__branch__code'],
+            'name': row['subject__branch__name'],
+        },
+    }
+
+
+@require_GET
+@condition(etag_func=_api_etag, last_modified_func=_api_last_modified)
+def resource_api(request):
+    """
+    Read-only JSON listing of vault resources with the same filters as VaultListView.
+
+    Unchanged polls are answered with 304 from a single aggregate query. Pages
+    are ordered by id; pass the returned ``next`` URL (``after=<id>``) to continue.
+    ``q`` returns the top-ranked search hits instead.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except (ValueError, TypeError):
+        limit = API_PAGE_SIZE
+
+    qs = _filter_resources(request.GET)
+    query = request.GET.get('q', '').strip()
+    next_url = None
+    if query:
+        rows = list(_order_by_search_rank(qs, query, request.GET).values(*API_FIELDS)[:limit])
+    else:
+        after = request.GET.get('after')
+        if after:
+            try:
+                qs = qs.filter(pk__gt=int(after))
+            except (ValueError, TypeError):
+                pass
+        rows = list(qs.order_by('pk').values(*API_FIELDS)[:limit])
+        if len(rows) == limit:
+            params = request.GET.copy()
+            params['after'] = rows[-1]['id']
+            next_url = f'{request.path}?{params.urlencode()}'
+
+    response = JsonResponse({
+        'count': _api_validator(request)['total'],
+        'next': next_url,
+        'results': [_serialize_resource(row) for row in rows],
+    })
+    # Let clients cache, but make them revalidate with the validators every time.
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@staff_member_required
+@require_GET
+def export_resources(request):
+    """Stream the filtered catalog as CSV (default) or JSON Lines (``?format=jsonl``)."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    content_type, extension = EXPORT_FORMATS[fmt]
+    rows = export_rows(_filter_resources(request.GET))
+    response = StreamingHttpResponse(export_lines(fmt, rows), content_type=f'{content_type}; charset=utf-8')
+    filename = f'vault-resources-{timezone.now():%Y%m%d}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response